@@ -0,0 +1,253 @@
+# api.py
+#
+# Read-only HTTP/JSON view of the Zotero library for notebooks, dashboards
+# and other local tools, served from the same reader (connection pool, key
+# cache, render cache) as the bot. Runs inside the bot when API_PORT is set
+# in config.py, or on its own:
+#
+#   python api.py --port 8765
+#
+#   GET  /items/<key>                 metadata + highlights bucketed by colour
+#   GET  /items?keys=<key>,<key>,...  several items at once (also POST {"keys": [...]})
+#   GET  /changes?since=<timestamp>   papers modified since then (UTC, "YYYY-MM-DD HH:MM:SS")
+#
+# Item responses carry an ETag derived from the item's annotation
+# fingerprint; send it back as If-None-Match to get a 304 without the item
+# being read again.
+
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import config
+import metrics
+from async_io import run_db
+from render_cache import get_rendered, put_rendered
+from zotero_reader import get_item_view, get_key_fingerprint, get_reader
+
+API_HOST = getattr(config, "API_HOST", "127.0.0.1")
+API_PORT = getattr(config, "API_PORT", None)   # None: don't serve from the bot
+API_VARIANT = "api/1"       # render cache variant; bump when the item JSON changes shape
+BATCH_MAX = 200             # keys per batch request
+MAX_BODY = 64 * 1024        # bytes accepted in a request body
+IDLE_TIMEOUT = 30.0         # seconds a keep-alive connection may sit idle
+RECENT_WINDOW = 24 * 3600   # /changes without ?since= looks back this far
+NO_VERSION = 2 ** 62        # modified_parent_ids: match on clientDateModified only
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def make_etag(fingerprints: list[str | None]) -> str:
+    return '"' + hashlib.sha1("\n".join(f or "" for f in fingerprints).encode()).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def cached_item_view(item_key: str, fingerprint: str | None) -> dict | None:
+    """
+    get_item_view through the render cache. Blocking.
+    """
+    data = get_rendered(item_key, API_VARIANT, fingerprint)
+    if data is None:
+        data = get_item_view(item_key)
+        if data is not None:
+            put_rendered(item_key, API_VARIANT, fingerprint, data)
+    return data
+
+
+def fingerprints_of(keys: list[str]) -> list[str | None]:
+    # Memoised by the reader until Zotero next writes, so usually no query
+    return [get_key_fingerprint(key) for key in keys]
+
+
+def views_of(keys: list[str], fingerprints: list[str | None]) -> dict[str, dict | None]:
+    return {key: cached_item_view(key, fp) if fp else None for key, fp in zip(keys, fingerprints)}
+
+
+def changes_since(since: str) -> dict:
+    """
+    Papers with anything (metadata, attachment, annotation, note) modified
+    at or after `since`, and the timestamp to pass as `since` next time.
+    Blocking.
+    """
+    reader = get_reader()
+    marks = reader.library_marks()
+    parent_ids: list[int] = []
+    for library_id in marks:
+        parent_ids.extend(reader.modified_parent_ids(library_id, since, NO_VERSION))
+    keys = reader.item_keys(parent_ids)
+    latest = max((modified for modified, _ in marks.values() if modified), default=since)
+    return {
+        "since": since,
+        "next": max(latest, since),
+        "items": [{"itemID": pid, "key": keys[pid]} for pid in parent_ids if pid in keys],
+    }
+
+
+def _parse_since(raw: str | None) -> str:
+    if not raw:
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - RECENT_WINDOW))
+    since = raw.replace("T", " ").removesuffix("Z")
+    try:
+        time.strptime(since[:19], "%Y-%m-%d %H:%M:%S" if len(since) > 10 else "%Y-%m-%d")
+    except ValueError:
+        raise HTTPError(400, "since must be a UTC timestamp like 2024-05-01 12:00:00")
+    return since
+
+
+async def route(method: str, target: str, headers: dict[str, str], body: bytes) -> tuple[int, dict | None, dict]:
+    """
+    (status, JSON payload, extra headers) for one request.
+    """
+    url = urlsplit(target)
+    path = url.path.rstrip("/")
+    query = parse_qs(url.query)
+    if_none_match = headers.get("if-none-match")
+
+    if path.startswith("/items/") and method == "GET":
+        key = unquote(path[len("/items/"):])
+        with metrics.trace("api_item"):
+            [fingerprint] = await run_db(fingerprints_of, [key])
+            if fingerprint is None:
+                raise HTTPError(404, f"no paper or PDF attachment with key {key}")
+            etag = make_etag([fingerprint])
+            if etag_matches(if_none_match, etag):
+                return 304, None, {"ETag": etag}
+            view = (await run_db(views_of, [key], [fingerprint]))[key]
+        if view is None:
+            raise HTTPError(404, f"{key} is not attached to a paper")
+        return 200, {"key": key, **view}, {"ETag": etag}
+
+    if path == "/items":
+        if method == "GET":
+            keys = [k for raw in query.get("keys", []) for k in raw.split(",") if k]
+        elif method == "POST":
+            try:
+                keys = json.loads(body or b"{}").get("keys", [])
+            except (ValueError, AttributeError):
+                raise HTTPError(400, 'body must be JSON like {"keys": ["ABCD1234"]}')
+        else:
+            raise HTTPError(405, "use GET or POST")
+        if not keys or not all(isinstance(k, str) for k in keys):
+            raise HTTPError(400, "no keys given")
+        if len(keys) > BATCH_MAX:
+            raise HTTPError(400, f"at most {BATCH_MAX} keys per request")
+        keys = list(dict.fromkeys(keys))
+        with metrics.trace("api_items"):
+            fingerprints = await run_db(fingerprints_of, keys)
+            etag = make_etag(keys + fingerprints)
+            if etag_matches(if_none_match, etag):
+                return 304, None, {"ETag": etag}
+            views = await run_db(views_of, keys, fingerprints)
+        return 200, {"items": views}, {"ETag": etag}
+
+    if path == "/changes" and method == "GET":
+        since = _parse_since((query.get("since") or [None])[0])
+        with metrics.trace("api_changes"):
+            return 200, await run_db(changes_since, since), {}
+
+    if path in ("/items", "/changes") or path.startswith("/items/"):
+        raise HTTPError(405, "method not allowed")
+    raise HTTPError(404, "unknown endpoint")
+
+
+def _response(status: int, payload: dict | None, extra: dict, keep_alive: bool) -> bytes:
+    body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    if status != 304:
+        lines.append("Content-Type: application/json; charset=utf-8")
+        lines.append(f"Content-Length: {len(body)}")
+    # Clients may keep responses but must revalidate them with If-None-Match
+    lines.append("Cache-Control: no-cache")
+    lines.extend(f"{name}: {value}" for name, value in extra.items())
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+            if not request_line.strip():
+                break
+            method, target, version = request_line.decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+            length = int(headers.get("content-length") or 0)
+            if length > MAX_BODY:
+                writer.write(_response(413, {"error": "request body too large"}, {}, False))
+                await writer.drain()
+                break
+            # A client that announces more body than it sends must not hold the connection forever
+            body = await asyncio.wait_for(reader.readexactly(length), IDLE_TIMEOUT) if length else b""
+
+            try:
+                status, payload, extra = await route(method.upper(), target, headers, body)
+            except HTTPError as e:
+                status, payload, extra = e.status, {"error": str(e)}, {}
+            except FileNotFoundError as e:
+                status, payload, extra = 503, {"error": f"Zotero DB not found ({e})"}, {}
+            except Exception as e:
+                status, payload, extra = 500, {"error": str(e)}, {}
+            metrics.metrics.inc("api_requests_total", status=status)
+
+            writer.write(_response(status, payload, extra, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(port: int, host: str = API_HOST) -> asyncio.AbstractServer:
+    """
+    Serve the API on the running event loop (e.g. the Discord client's).
+    """
+    return await asyncio.start_server(handle_connection, host, port)
+
+
+async def serve(port: int, host: str) -> None:
+    server = await start_server(port, host)
+    print(f"🌐 Zotero API at http://{host}:{port}/items/<key>")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Zotero reader over HTTP.")
+    parser.add_argument("--port", type=int, default=API_PORT or 8765, help="default: %(default)s")
+    parser.add_argument("--host", default=API_HOST, help="default: %(default)s")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.port, args.host))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import config
+import metrics
+import zotero_reader
+
+# Tunables (override in config.py)
+DB_WORKERS = getattr(config, "DB_WORKERS", zotero_reader.POOL_SIZE)
+SHEETS_WORKERS = getattr(config, "SHEETS_WORKERS", 2)
+SUMMARY_WORKERS = getattr(config, "SUMMARY_WORKERS", 4)   # papers summarised at once
+MAX_CONCURRENT_COMMANDS = getattr(config, "MAX_CONCURRENT_COMMANDS", 8)
+
+# DB reads and Sheets writes get separate pools so a slow Sheets round trip
+# never holds up a Zotero lookup (and vice versa).
+db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="zotero-db")
+sheets_executor = ThreadPoolExecutor(max_workers=SHEETS_WORKERS, thread_name_prefix="sheets")
+# Summaries take seconds each, so they get their own pool as well
+summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summary")
+
+_command_slots = asyncio.Semaphore(MAX_CONCURRENT_COMMANDS)
+
+
+async def _run(stage: str, executor: ThreadPoolExecutor, fn, *args):
+    submitted = time.perf_counter()
+    # Run in a copy of the caller's context so the command's metrics trace
+    # (and its query counter) follows the call onto the worker thread
+    context = contextvars.copy_context()
+
+    def call():
+        started = time.perf_counter()
+        # Time queued for a worker is its own stage ("db_wait", "sheets_wait", ...),
+        # so a saturated pool shows up in \stats and /metrics
+        metrics.record_stage(f"{stage}_wait", started - submitted)
+        try:
+            return fn(*args)
+        finally:
+            metrics.record_stage(stage, time.perf_counter() - started)
+
+    return await asyncio.get_running_loop().run_in_executor(executor, context.run, call)
+
+
+async def run_db(fn, *args):
+    """
+    Run a blocking Zotero DB read on the DB pool.
+    """
+    return await _run("db", db_executor, fn, *args)
+
+
+async def run_sheets(fn, *args):
+    """
+    Run a blocking Google Sheets call on the Sheets pool.
+    """
+    return await _run("sheets", sheets_executor, fn, *args)
+
+
+async def run_summary(fn, *args):
+    """
+    Run a blocking summarisation request on the summary pool.
+    """
+    return await _run("summary", summary_executor, fn, *args)
+
+
+@asynccontextmanager
+async def command_slot():
+    """
+    Limit how many commands are processed at once (MAX_CONCURRENT_COMMANDS).
+    """
+    queued = time.perf_counter()
+    async with _command_slots:
+        metrics.record_stage("queue", time.perf_counter() - queued)
+        yield
@@ -0,0 +1,209 @@
+# benchmark.py
+#
+# Time the reader's per-command paths against synthetic libraries of
+# increasing size and save the numbers as JSON, so a slowdown shows up as a
+# diff between two result files rather than as a user complaint.
+#
+#   python benchmark.py --scales 1000,50000 --highlights 20
+#   python benchmark.py --scales 500000 --iterations 100 --out bench_500k.json
+#   python benchmark.py --compare bench_old.json bench_results.json
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import metrics
+import synthetic_db
+import zotero_reader
+
+DATA_DIR = "bench_data"
+RESULTS_PATH = "bench_results.json"
+MEMORY_SAMPLES = 20  # calls per command traced for peak memory (tracing slows calls)
+
+
+def _pack_buckets(annotations: list[dict]) -> None:
+    # What \pull does after the read: group by colour, number and pack
+    buckets: dict[str, list[str]] = {}
+    for ann in annotations:
+        buckets.setdefault(ann["color"], []).append(ann["text"])
+    for texts in buckets.values():
+        if pack_messages is not None:
+            pack_messages("📌 **Paper**\n🔗 https://example.org", texts)
+        else:
+            zotero_reader.format_bullets(texts)
+
+
+try:
+    from delivery import pack_messages
+except ImportError:  # delivery needs discord.py; fall back to format_bullets only
+    pack_messages = None
+
+
+def commands(prefetched: dict[str, list[dict]]) -> dict:
+    return {
+        "get_attachment_id_from_key": zotero_reader.get_attachment_id_from_key,
+        "get_annotations_by_key": zotero_reader.get_annotations_by_key,
+        "get_item_metadata": zotero_reader.get_item_metadata,
+        "get_full_metadata": zotero_reader.get_full_metadata,
+        "format_and_pack": lambda key: _pack_buckets(prefetched[key]),
+    }
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def database_for(items: int, highlights: int, data_dir: str) -> str:
+    path = os.path.join(data_dir, f"zotero_{items}x{highlights}.sqlite")
+    if not os.path.isfile(path):
+        print(f"🛠  Generating {items} papers × {highlights} highlights …")
+        summary = synthetic_db.build(path, items, highlights)
+        print(f"   {summary['bytes'] / 1e6:.1f} MB in {summary['seconds']}s")
+    return path
+
+
+def attachment_keys(db_path: str) -> list[str]:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT key FROM items JOIN itemAttachments USING (itemID) ORDER BY itemID"
+        )]
+    finally:
+        conn.close()
+
+
+def run_scale(db_path: str, iterations: int, seed: int) -> list[dict]:
+    reader = zotero_reader.ZoteroReader(db_path, key_index_path=None)
+    zotero_reader.ZOTERO_DB_PATH = db_path
+    zotero_reader._reader = reader  # module-level helpers now go through this reader
+
+    rng = random.Random(seed)
+    keys = rng.choices(attachment_keys(db_path), k=iterations)
+    prefetched = {key: reader.annotations(key) for key in set(keys)}
+
+    results = []
+    for name, fn in commands(prefetched).items():
+        fn(keys[0])  # warm the pool and statement cache
+        # Start each command with an empty key cache, so first lookups pay
+        # for resolution and repeats hit the cache, as in real use
+        reader.keys = zotero_reader.ResolutionCache(db_path, None)
+        queries_before = metrics.metrics.counter("sqlite_queries_total")
+        timings = []
+        for key in keys:
+            start = time.perf_counter()
+            fn(key)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries = metrics.metrics.counter("sqlite_queries_total") - queries_before
+
+        tracemalloc.start()
+        for key in keys[:MEMORY_SAMPLES]:
+            fn(key)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings.sort()
+        results.append({
+            "command": name,
+            "iterations": iterations,
+            "p50_ms": round(percentile(timings, 50), 4),
+            "p99_ms": round(percentile(timings, 99), 4),
+            "mean_ms": round(sum(timings) / len(timings), 4),
+            "queries_per_call": round(queries / iterations, 2),
+            "peak_kib": round(peak / 1024, 1),
+        })
+
+    reader.close()
+    zotero_reader._reader = None
+    return results
+
+
+def _peak_rss_kib() -> int | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path, encoding="utf-8") as f:
+        old = {(r["items"], r["highlights_per_item"], r["command"]): r for r in json.load(f)["results"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["results"]
+    print(f"{'scale':>14}  {'command':<28}{'p50 ms':>18}{'p99 ms':>18}{'queries':>14}")
+    for r in new:
+        before = old.get((r["items"], r["highlights_per_item"], r["command"]))
+        if before is None:
+            continue
+
+        def delta(field: str) -> str:
+            a, b = before[field], r[field]
+            pct = f"{(b - a) / a * 100:+.0f}%" if a else ""
+            return f"{b:.3f} {pct:>6}"
+
+        print(f"{r['items']:>8}×{r['highlights_per_item']:<5}  {r['command']:<28}"
+              f"{delta('p50_ms'):>18}{delta('p99_ms'):>18}{before['queries_per_call']:>6}→{r['queries_per_call']:<6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark zotero_reader on synthetic libraries.")
+    parser.add_argument("--scales", default="1000,50000", help="comma-separated paper counts (default: %(default)s)")
+    parser.add_argument("--highlights", type=int, default=20, help="highlights per paper (default: %(default)s)")
+    parser.add_argument("--iterations", type=int, default=500, help="calls per command (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DATA_DIR, help="where generated DBs are kept (default: %(default)s)")
+    parser.add_argument("--out", default=RESULTS_PATH, help="results JSON (default: %(default)s)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = []
+    for items in (int(s) for s in args.scales.split(",") if s.strip()):
+        db_path = database_for(items, args.highlights, args.data_dir)
+        print(f"⏱  {items} papers × {args.highlights} highlights")
+        for r in run_scale(db_path, args.iterations, args.seed):
+            r = {"items": items, "highlights_per_item": args.highlights, **r}
+            results.append(r)
+            print(f"   {r['command']:<28} p50 {r['p50_ms']:8.3f} ms   p99 {r['p99_ms']:8.3f} ms"
+                  f"   {r['queries_per_call']:5} q/call   peak {r['peak_kib']:8.1f} KiB")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "peak_rss_kib": _peak_rss_kib(),
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
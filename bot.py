@@ -1,9 +1,27 @@
+import time
+BOOT_STARTED = time.perf_counter()  # cold start is measured from here
+
 import discord
 import asyncio
-from zotero_reader import get_annotations_by_key, get_item_metadata, get_full_metadata
-from google_sheets import append_to_sheet  # NEW
+import hashlib
+import json
+import os
+from zotero_reader import (
+    get_annotations_by_key, get_item_metadata, get_full_metadata,
+    get_group_item_ids, get_bulk_full_metadata, get_item_fields, get_key_fingerprint, get_parent_id,
+    get_image_annotations, get_reader, BUCKETS,
+)
+from ledger import get_ledger
+from async_io import run_db, run_sheets, run_summary, command_slot
+from delivery import delivery, pack_messages, pack_embeds, pack_files, messages_to_json, messages_from_json
+from render_cache import get_rendered, put_rendered
+import metrics
 import config
 
+# Google Sheets, image processing, search and the watcher are imported on
+# first use, so startup doesn't pay for them (or fail on their config)
+IMPORTS_DONE = time.perf_counter()
+
 intents = discord.Intents.default()
 intents.messages = True
 intents.message_content = True
@@ -12,10 +30,122 @@ client = discord.Client(intents=intents)
 SAKHA_ID = config.DISCORD_USER_ID
 user_mention = f"<@{SAKHA_ID}>"
 
+COMMAND_PREFIXES = (r"\pull ", r"\push ", r"\pushall ", r"\search ")
+BARE_COMMANDS = (r"\stats",)
+PUSHALL_CHUNK = 200  # papers loaded per bulk round trip in \pushall
+FORCE_FLAG = "--force"  # \pull <key> --force resends highlights already delivered
+CONTEXT_FLAG = "--context"  # \pull / \push <key> --context expands highlights to whole sentences
+CONTEXT_MODE = getattr(config, "CONTEXT_MODE", False)  # expand to sentences without the flag
+MERGE_HIGHLIGHTS = getattr(config, "MERGE_HIGHLIGHTS", True)  # one bullet for overlapping same-colour highlights
+SUMMARY_FLAG = "--summarize"  # \push <key> --summarize condenses long highlight cells (needs OPENROUTER_API_KEY)
+SUMMARY_MODE = getattr(config, "SUMMARY_MODE", False)  # summarise in \push / \pushall without the flag
+FULL_LAYOUT = 2  # bump when the cached \push metadata changes shape
+PULL_LAYOUT = 4  # bump when the cached \pull payload changes shape
+PULL_IMAGES = getattr(config, "PULL_IMAGES", True)  # also send image (area) annotations
+
+DISCORD_USE_EMBEDS = getattr(config, "DISCORD_USE_EMBEDS", False)  # pack bullets into embeds
+
+# Optional watcher mode: auto-post new highlights without a \pull
+WATCH_ZOTERO = getattr(config, "WATCH_ZOTERO", False)
+WATCH_POLL_INTERVAL = getattr(config, "WATCH_POLL_INTERVAL", 2.0)   # seconds between stat() checks
+WATCH_DEBOUNCE = getattr(config, "WATCH_DEBOUNCE", 3.0)             # quiet time before reading
+
+# Metrics (optional): Prometheus endpoint on localhost, slow-command log
+METRICS_PORT = getattr(config, "METRICS_PORT", None)            # e.g. 9464; None disables it
+SLOW_COMMAND_MS = getattr(config, "SLOW_COMMAND_MS", None)      # log stage breakdown above this
+
+# Local HTTP/JSON API (optional), served from this process's reader; see api.py
+API_PORT = getattr(config, "API_PORT", None)                    # e.g. 8765; None disables it
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected
+background_tasks: set[asyncio.Task] = set()
+
+def track_task(task: asyncio.Task) -> asyncio.Task:
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+watch_task: asyncio.Task | None = None
+metrics_server = None
+api_server = None
+startup: dict[str, float] = {}  # cold start phases, in seconds since BOOT_STARTED
+
 @client.event
 async def on_ready():
     print(f"✅ Logged in as {client.user} (ID: {client.user.id})")
-    print("Bot is ready to receive \\pull and \\push commands.")
+    print("Bot is ready to receive \\pull, \\push, \\pushall, \\search and \\stats commands.")
+    global watch_task, metrics_server, api_server
+    if not startup:
+        record_startup("imports", IMPORTS_DONE - BOOT_STARTED)
+        record_startup("ready", time.perf_counter() - BOOT_STARTED)
+        print(f"⏱  Cold start: imports {startup['imports'] * 1000:.0f} ms, ready after {startup['ready']:.2f}s")
+        track_task(asyncio.create_task(warm_up()))
+    if WATCH_ZOTERO and watch_task is None:
+        watch_task = track_task(asyncio.create_task(watch_zotero()))
+        print("👀 Watching Zotero for new highlights.")
+    if METRICS_PORT and metrics_server is None:
+        metrics_server = metrics.start_http_server(int(METRICS_PORT))
+        print(f"📈 Metrics at http://127.0.0.1:{METRICS_PORT}/metrics")
+    if API_PORT and api_server is None:
+        import api
+        api_server = await api.start_server(int(API_PORT))
+        print(f"🌐 Zotero API at http://{api.API_HOST}:{API_PORT}/items/<key>")
+
+def record_startup(phase: str, seconds: float) -> None:
+    startup[phase] = seconds
+    metrics.metrics.set_gauge("startup_seconds", seconds, phase=phase)
+
+def warm_db() -> None:
+    # Opens a pooled connection and resolves item types; cheap query
+    get_reader().max_annotation_id()
+
+async def warm_up():
+    """
+    Open a Zotero connection and authorize Google Sheets in the background
+    after login, so the first commands after a restart don't pay for it.
+    Commands that arrive meanwhile simply wait for whichever part they need.
+    """
+    try:
+        await run_db(warm_db)
+    except Exception as e:
+        print(f"⚠️ Zotero warm-up failed: {e}")
+    if getattr(config, "SERVICE_ACCOUNT_FILE", ""):
+        try:
+            import google_sheets
+            await run_sheets(google_sheets.warm_up)
+        except Exception as e:
+            print(f"⚠️ Google Sheets warm-up failed: {e}")
+    record_startup("warm", time.perf_counter() - BOOT_STARTED)
+    print(f"⏱  Warmed up after {startup['warm']:.2f}s")
+
+async def watch_zotero():
+    from watcher import ZoteroWatcher
+
+    watcher = None
+    while True:
+        await asyncio.sleep(WATCH_POLL_INTERVAL)
+        try:
+            # Built inside the loop, so a missing or locked DB at startup is retried
+            if watcher is None:
+                watcher = await run_db(ZoteroWatcher, None, WATCH_DEBOUNCE)
+                continue
+            annotations = await run_db(watcher.poll)
+            if not annotations:
+                continue
+
+            by_paper: dict[int, dict[str, dict]] = {}
+            for ann in annotations:
+                colors = by_paper.setdefault(ann["paperID"], {})
+                bucket = colors.setdefault(ann["color"], {"ids": [], "texts": []})
+                bucket["ids"].append(ann["itemID"])
+                bucket["texts"].append(ann["text"])
+
+            fields = await run_db(get_item_fields, list(by_paper), ["title", "url"])
+            for paper_id, colors in by_paper.items():
+                title = fields[paper_id]["title"] or f"item {paper_id}"
+                await deliver_highlights({"title": title, "url": fields[paper_id]["url"], "colors": colors})
+        except Exception as e:
+            print(f"⚠️ Zotero watcher error: {e}")
 
 @client.event
 async def on_message(message: discord.Message):
@@ -23,21 +153,199 @@ async def on_message(message: discord.Message):
         return
 
     content = message.content.strip()
+    if not (content.lower().startswith(COMMAND_PREFIXES) or content.lower() in BARE_COMMANDS):
+        return
+
+    # DB and Sheets I/O run on executors, so commands from different users
+    # proceed in parallel up to MAX_CONCURRENT_COMMANDS.
+    command = content.split(maxsplit=1)[0].lstrip("\\").lower()
+    with metrics.trace(command) as trace:
+        async with command_slot():
+            await handle_command(message, content)
+    if SLOW_COMMAND_MS and trace.duration * 1000 >= SLOW_COMMAND_MS:
+        print(f"🐢 Slow command: {trace.summary()}")
 
+def bucket_intro(color_name: str, title: str, url: str | None) -> str:
+    label = config.COLOR_LABEL_MAP.get(color_name, color_name)
+    return f"{user_mention} found '{label}' in the paper {f'[{title}]({url})' if url else title}"
+
+def render_buckets(buckets: dict[str, list[str]], title: str, url: str | None) -> dict[str, list[dict]]:
+    """
+    Pack each colour's highlights into send() keyword dicts for its channel.
+    """
+    rendered = {}
+    for color_name, texts in buckets.items():
+        if not texts or not config.COLOR_CHANNEL_MAP.get(color_name):
+            continue
+        intro = bucket_intro(color_name, title, url)
+        rendered[color_name] = pack_embeds(intro, texts) if DISCORD_USE_EMBEDS else pack_messages(intro, texts)
+    return rendered
+
+def split_flags(text: str, flags: tuple[str, ...]) -> tuple[str, set[str]]:
+    # "KEY --force" -> ("KEY", {"--force"})
+    words = text.split()
+    return " ".join(w for w in words if w not in flags), {w for w in words if w in flags}
+
+def pull_variant(colors: list[str], context: bool = False) -> str:
+    # Everything besides the highlights that shapes \pull's rendered messages
+    labels = [config.COLOR_LABEL_MAP.get(c, c) for c in colors]
+    mode = "embeds" if DISCORD_USE_EMBEDS else "text"
+    settings = [PULL_LAYOUT, mode, user_mention, colors, labels, PULL_IMAGES, context, MERGE_HIGHLIGHTS]
+    return "pull/" + hashlib.sha1(json.dumps(settings).encode()).hexdigest()[:16]
+
+def render_pull(item_key: str, wanted: list[str], context: bool = False) -> dict | None:
+    """
+    A paper's highlights per colour, with their annotation itemIDs and the
+    messages \\pull would send for them, plus its image annotations:
+    {"title", "url", "colors": {color: {"ids", "texts", "merged", "messages", "images"}}},
+    where merged maps str(id) of a bullet built from several overlapping
+    highlights to the other highlights' ids, and images are
+    {"id", "path", "name", "size"} of the processed copies.
+    An unchanged paper comes straight from the render cache, without
+    reading its highlights or re-packing them. None if it has none.
+    Blocking; run it on the DB executor.
+    """
+    fingerprint = get_key_fingerprint(item_key)
+    variant = pull_variant(wanted, context)
+    cached = get_rendered(item_key, variant, fingerprint)
+    if cached is not None and all(
+        os.path.isfile(image["path"]) for bucket in cached["colors"].values() for image in bucket["images"]
+    ):
+        colors = {color: {**bucket, "messages": messages_from_json(bucket["messages"])}
+                  for color, bucket in cached["colors"].items()}
+        return {**cached, "colors": colors}
+
+    annotations = get_annotations_by_key(item_key, wanted, context=context, merge=MERGE_HIGHLIGHTS)
+    images = get_image_annotations(item_key, wanted) if PULL_IMAGES else []
+    if not annotations and not images:
+        return None
+    colors: dict[str, dict] = {}
+    for ann in annotations:
+        bucket = colors.setdefault(ann["color"], {"ids": [], "texts": [], "merged": {}, "images": []})
+        bucket["ids"].append(ann["itemID"])
+        bucket["texts"].append(ann["text"])
+        if ann.get("mergedIDs"):
+            bucket["merged"][str(ann["itemID"])] = ann["mergedIDs"]
+    # Resized on the image process pool; unchanged images come from its cache
+    processed = []
+    if images:
+        from images import prepare_images
+        processed = prepare_images([image["path"] for image in images])
+    for image, prepared in zip(images, processed):
+        if prepared is None:
+            continue
+        page = f"p{image['pageLabel']}-" if image["pageLabel"] else ""
+        bucket = colors.setdefault(image["color"], {"ids": [], "texts": [], "merged": {}, "images": []})
+        bucket["images"].append({
+            "id": image["itemID"],
+            "path": prepared["path"],
+            "name": f"{page}{image['key']}{os.path.splitext(prepared['path'])[1]}",
+            "size": prepared["size"],
+        })
+
+    metadata = get_item_metadata(item_key)
+    title, url = metadata.get("title") or item_key, metadata.get("url")
+    rendered = render_buckets({color: bucket["texts"] for color, bucket in colors.items()}, title, url)
+    colors = {color: {**bucket, "messages": rendered.get(color, [])}
+              for color, bucket in colors.items() if config.COLOR_CHANNEL_MAP.get(color)}
+    put_rendered(item_key, variant, fingerprint, {
+        "title": title,
+        "url": url,
+        "colors": {color: {**bucket, "messages": messages_to_json(bucket["messages"])} for color, bucket in colors.items()},
+    })
+    return {"title": title, "url": url, "colors": colors}
+
+def cached_full_metadata(item_key: str, context: bool = False) -> dict:
+    """
+    get_full_metadata through the render cache. Blocking.
+    """
+    fingerprint = get_key_fingerprint(item_key)
+    variant = f"full/{FULL_LAYOUT}" + ("/context" if context else "") + ("/merged" if MERGE_HIGHLIGHTS else "")
+    data = get_rendered(item_key, variant, fingerprint)
+    if data is None:
+        data = get_full_metadata(item_key, context, MERGE_HIGHLIGHTS)
+        if data:
+            put_rendered(item_key, variant, fingerprint, data)
+    return data
+
+async def deliver_highlights(pull: dict, report_channel=None, force: bool = False) -> tuple[int, int]:
+    """
+    Sends each colour's highlights to its channel from config.COLOR_CHANNEL_MAP,
+    skipping those the ledger says that channel already has (unless force).
+    A bullet merged from several highlights counts as new if any of them
+    is. Image annotations follow a colour's text as attachments, up to 10
+    per message. Returns (annotations sent, annotations skipped).
+    """
+    ledger = get_ledger()
+    pending, sent, skipped = [], 0, 0
+    for color_name, bucket in pull["colors"].items():
+        channel_id_str = config.COLOR_CHANNEL_MAP.get(color_name)
+        if not channel_id_str:
+            continue
+        channel_id = int(channel_id_str)
+        try:
+            target_channel = client.get_channel(channel_id) or await client.fetch_channel(channel_id)
+        except Exception:
+            if report_channel is not None:
+                await report_channel.send(f"⚠️ Could not find Discord channel for color '{color_name}'")
+            continue
+
+        ids, images, merged = bucket["ids"], bucket.get("images", []), bucket.get("merged", {})
+        members = [[ann_id] + merged.get(str(ann_id), []) for ann_id in ids]
+        all_ids = [m for group in members for m in group] + [image["id"] for image in images]
+        already = set() if force else await run_db(ledger.delivered, channel_id, all_ids)
+        new = [i for i, group in enumerate(members) if not already.issuperset(group)]
+        new_images = [image for image in images if image["id"] not in already]
+        skipped += len(ids) + len(images) - len(new) - len(new_images)
+        if not new and not new_images:
+            continue
+        if not new:
+            messages = []
+        elif len(new) == len(ids) and bucket.get("messages"):
+            messages = bucket["messages"]
+        else:
+            texts = [bucket["texts"][i] for i in new]
+            messages = render_buckets({color_name: texts}, pull["title"], pull["url"])[color_name]
+        if new_images:
+            intro = None if messages else bucket_intro(color_name, pull["title"], pull["url"])
+            messages = messages + pack_files(intro, [(image["path"], image["name"], image["size"]) for image in new_images])
+        new_ids = [m for i in new for m in members[i]] + [image["id"] for image in new_images]
+        sent += len(new) + len(new_images)
+        pending.append((channel_id, new_ids, len(new) + len(new_images), delivery.submit(target_channel, messages)))
+
+    # Channels are delivered concurrently; wait until every one has finished,
+    # and only record the channels whose messages all went out
+    results = await asyncio.gather(*(future for _, _, _, future in pending), return_exceptions=True)
+    for (channel_id, new_ids, count, _), result in zip(pending, results):
+        if isinstance(result, Exception):
+            sent -= count
+            if report_channel is not None:
+                await report_channel.send(f"⚠️ Failed to deliver some highlights: {result}")
+        else:
+            await run_db(ledger.mark_delivered, channel_id, new_ids)
+    return sent, skipped
+
+async def handle_command(message: discord.Message, content: str):
     # ──────────────────────────
     # HANDLE: \pull <item_key>
     # ──────────────────────────
     if content.lower().startswith(r"\pull "):
         parts = content.split(maxsplit=1)
         if len(parts) < 2 or not parts[1].strip():
-            await message.channel.send("⚠️ Usage: `\\pull <ZoteroAttachmentKey>` (e.g. `\\pull RFCM2DHI`)")
+            await message.channel.send("⚠️ Usage: `\\pull <ZoteroItemKey> [--force] [--context]` (paper or PDF attachment key, e.g. `\\pull RFCM2DHI`)")
             return
 
-        item_key = parts[1].strip()
+        item_key, flags = split_flags(parts[1], (FORCE_FLAG, CONTEXT_FLAG))
+        force, context = FORCE_FLAG in flags, CONTEXT_MODE or CONTEXT_FLAG in flags
+        if not item_key:
+            await message.channel.send("⚠️ Usage: `\\pull <ZoteroItemKey> [--force] [--context]`")
+            return
         await message.channel.send(f"🔍 Pulling annotations for Zotero itemKey: **{item_key}** ...")
 
         try:
-            annotations = get_annotations_by_key(item_key)
+            # Only fetch colours that actually have a channel to go to
+            wanted = [c for c in BUCKETS if config.COLOR_CHANNEL_MAP.get(c)]
+            pull = await run_db(render_pull, item_key, wanted, context)
         except FileNotFoundError as e:
             await message.channel.send(f"❌ Zotero DB not found. ({e})")
             return
@@ -45,54 +353,18 @@ async def on_message(message: discord.Message):
             await message.channel.send(f"❌ Unexpected error: {e}")
             return
 
-        if not annotations:
+        if not pull:
             await message.channel.send("⚠️ No annotations found.")
             return
 
-        buckets = { "yellow": [], "green": [], "blue": [], "purple": [], "red": [] }
-        for ann in annotations:
-            color = ann["color"]
-            text  = ann["text"]
-            if color in buckets:
-                buckets[color].append(text)
+        sent, skipped = await deliver_highlights(pull, message.channel, force)
 
-        metadata = get_item_metadata(item_key)
-        title = metadata.get("title") or item_key
-        url = metadata.get("url")
-
-        for color_name, texts in buckets.items():
-            if not texts:
-                continue
-            channel_id_str = config.COLOR_CHANNEL_MAP.get(color_name)
-            if not channel_id_str:
-                continue
-            try:
-                target_channel = client.get_channel(int(channel_id_str)) or await client.fetch_channel(int(channel_id_str))
-            except Exception:
-                await message.channel.send(f"⚠️ Could not find Discord channel for color '{color_name}'")
-                continue
-
-            label = config.COLOR_LABEL_MAP.get(color_name, color_name)
-            intro = f"{user_mention} found '{label}' in the paper {f'[{title}]({url})' if url else title}"
-            await target_channel.send(f"{intro} ")
-
-            # chunked messages for Discord limit
-            max_len = 2000
-            bullet_chunks, current_chunk, current_len = [], [], 0
-            for idx, text in enumerate(texts, start=1):
-                bullet = f"{idx}. {text}"
-                if current_len + len(bullet) + 1 > max_len:
-                    bullet_chunks.append(current_chunk)
-                    current_chunk, current_len = [], 0
-                current_chunk.append(bullet)
-                current_len += len(bullet) + 1
-            if current_chunk:
-                bullet_chunks.append(current_chunk)
-            for chunk in bullet_chunks:
-                await target_channel.send("\n".join(chunk))
-            await target_channel.send("\u200b")
-
-        await message.channel.send("✅ Finished pushing all found highlights.")
+        if not sent and skipped:
+            await message.channel.send(f"✅ Nothing new: all {skipped} highlights were already delivered (add `{FORCE_FLAG}` to resend).")
+        elif skipped:
+            await message.channel.send(f"✅ Sent {sent} new highlights ({skipped} already delivered).")
+        else:
+            await message.channel.send("✅ Finished pushing all found highlights.")
         return
 
     # ──────────────────────────
@@ -101,45 +373,231 @@ async def on_message(message: discord.Message):
     if content.lower().startswith(r"\push "):
         parts = content.split(maxsplit=1)
         if len(parts) < 2 or not parts[1].strip():
-            await message.channel.send("⚠️ Usage: `\\push <ZoteroAttachmentKey>` (e.g. `\\push RFCM2DHI`)")
+            await message.channel.send("⚠️ Usage: `\\push <ZoteroItemKey> [--context] [--summarize]` (paper or PDF attachment key, e.g. `\\push RFCM2DHI`)")
             return
 
-        item_key = parts[1].strip()
+        item_key, flags = split_flags(parts[1], (CONTEXT_FLAG, SUMMARY_FLAG))
+        context = CONTEXT_MODE or CONTEXT_FLAG in flags
+        summarize = SUMMARY_MODE or SUMMARY_FLAG in flags
+        if not item_key:
+            await message.channel.send("⚠️ Usage: `\\push <ZoteroItemKey> [--context] [--summarize]`")
+            return
+
+        from google_sheets import enqueue_row, LEDGER_SHEET
+
         await message.channel.send(f"📤 Pushing Zotero item **{item_key}** to Google Sheets...")
 
         try:
-            data = get_full_metadata(item_key)
+            data = await run_db(cached_full_metadata, item_key, context)
             if not data:
                 await message.channel.send("⚠️ No metadata found for this key.")
                 return
+            parent_id = await run_db(get_parent_id, item_key)
+            row_number = (await run_db(get_ledger().sheet_rows, LEDGER_SHEET, [parent_id])).get(parent_id)
         except Exception as e:
             await message.channel.send(f"❌ Error extracting metadata: {e}")
             return
 
-        # Fill the row for the sheet
-        row = [
-            config.USER_EMAIL,  # Email
-            data.get("title"),
-            "",  # Relevance (manual)
-            data.get("authors"),
-            data.get("year"),
-            data.get("venue"),
-            data.get("doi"),
-            "",  # Tag (manual)
-            data.get("claims"),
-            data.get("limitations"),
-            data.get("contributions"),
-            data.get("methodology"),
-            data.get("result"),
-            "",  # Links (manual)
-            "",  # Notes (manual)
-        ]
+        if summarize:
+            [data] = await summarize_papers([data], message.channel)
+        row = build_sheet_row(data)
+
+        try:
+            pending = await run_sheets(enqueue_row, row, row_number, parent_id)
+        except Exception as e:
+            await message.channel.send(f"❌ Failed to write to Google Sheet: {e}")
+            return
+
+        await message.channel.send("📝 Row queued for Google Sheets.")
+        # Report back once the batched flush commits, without holding a command slot
+        track_task(asyncio.create_task(report_sheet_flush(message.channel, pending, row_number)))
+        return
+
+    # ──────────────────────────────────────
+    # HANDLE: \pushall <collection|tag>
+    # ──────────────────────────────────────
+    if content.lower().startswith(r"\pushall "):
+        parts = content.split(maxsplit=1)
+        if len(parts) < 2 or not parts[1].strip():
+            await message.channel.send("⚠️ Usage: `\\pushall <collection|tag>` (e.g. `\\pushall Reading List`)")
+            return
+
+        from google_sheets import enqueue_rows, LEDGER_SHEET
+
+        group_name = parts[1].strip()
+        started = time.perf_counter()
+        progress = await message.channel.send(f"📚 Resolving **{group_name}** ...")
 
         try:
-            append_to_sheet(row)
-            await message.channel.send("✅ Row added to Google Sheet successfully.")
+            kind, parent_ids = await run_db(get_group_item_ids, group_name)
+        except Exception as e:
+            await progress.edit(content=f"❌ Error resolving '{group_name}': {e}")
+            return
+        if not parent_ids:
+            await progress.edit(content=f"⚠️ No collection or tag named **{group_name}**.")
+            return
+
+        rows, row_pids, row_numbers = [], [], []
+        for start in range(0, len(parent_ids), PUSHALL_CHUNK):
+            chunk = parent_ids[start:start + PUSHALL_CHUNK]
+            try:
+                papers = await run_db(get_bulk_full_metadata, chunk, MERGE_HIGHLIGHTS)
+                existing = await run_db(get_ledger().sheet_rows, LEDGER_SHEET, list(papers))
+            except Exception as e:
+                await progress.edit(content=f"❌ Error extracting metadata: {e}")
+                return
+            if SUMMARY_MODE:
+                pids = list(papers)
+                papers = dict(zip(pids, await summarize_papers([papers[pid] for pid in pids], message.channel)))
+            for pid in chunk:
+                if pid in papers:
+                    rows.append(build_sheet_row(papers[pid]))
+                    row_pids.append(pid)
+                    row_numbers.append(existing.get(pid))
+            done = min(start + PUSHALL_CHUNK, len(parent_ids))
+            await progress.edit(content=f"📚 {kind} **{group_name}**: read {done}/{len(parent_ids)} items, {len(rows)} with PDFs ...")
+
+        if not rows:
+            await progress.edit(content=f"⚠️ None of the {len(parent_ids)} items in **{group_name}** have a PDF attachment.")
+            return
+
+        try:
+            pending = await run_sheets(enqueue_rows, rows, row_numbers, row_pids)
         except Exception as e:
             await message.channel.send(f"❌ Failed to write to Google Sheet: {e}")
+            return
+
+        try:
+            written = await asyncio.gather(*map(asyncio.wrap_future, pending))
+        except Exception as e:
+            await message.channel.send(f"⚠️ Google Sheet write failed ({e}); the rows stay queued and will be retried.")
+            return
+
+        updated = sum(1 for old, new in zip(row_numbers, written) if old is not None and old == new)
+        elapsed = time.perf_counter() - started
+        await message.channel.send(
+            f"✅ Pushed {len(rows)} papers from {kind} **{group_name}** in {elapsed:.1f}s "
+            f"({len(rows) / elapsed:.1f} papers/s, {updated} updated in place, "
+            f"{len(parent_ids) - len(rows)} skipped without PDF)."
+        )
+        return
+
+    # ──────────────────────────────────────────────
+    # HANDLE: \search <query> [color:red] [year:2023]
+    # ──────────────────────────────────────────────
+    if content.lower().startswith(r"\search "):
+        parts = content.split(maxsplit=1)
+        if len(parts) < 2 or not parts[1].strip():
+            await message.channel.send("⚠️ Usage: `\\search <query> [color:red] [year:2023]`")
+            return
+
+        from search_index import search_highlights
+
+        query = parts[1].strip()
+        started = time.perf_counter()
+        try:
+            results = await run_db(search_highlights, query)
+        except Exception as e:
+            await message.channel.send(f"❌ Search failed: {e}")
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if not results:
+            await message.channel.send(f"🔎 No highlights match **{query}**.")
+            return
+
+        lines = []
+        for r in results:
+            year = f" ({r['year']})" if r["year"] else ""
+            lines.append(f"`{r['key']}` {r['title'] or '(untitled)'}{year} [{r['color'] or 'other'}]: {r['snippet']}")
+        intro = f"🔎 {len(results)} matches for **{query}** ({elapsed_ms:.0f} ms)"
+        for kwargs in pack_messages(intro, lines):
+            await message.channel.send(**kwargs)
+        return
+
+    # ──────────────────────────
+    # HANDLE: \stats
+    # ──────────────────────────
+    if content.lower() == r"\stats":
+        await message.channel.send(format_stats())
+        return
+
+def format_stats() -> str:
+    snapshot = metrics.metrics.snapshot()
+    lines = ["📈 **Bot stats**"]
+    for command, c in sorted(snapshot["commands"].items()):
+        lines.append(
+            f"`\\{command}` ×{c['count']:g}: p50 {c['p50'] * 1000:.0f} ms, p99 {c['p99'] * 1000:.0f} ms, "
+            f"{c['queries'] / (c['count'] or 1):.1f} queries avg"
+        )
+    if snapshot["stages"]:
+        lines.append("Stages: " + ", ".join(
+            f"{stage} {s['avg'] * 1000:.1f} ms avg ×{s['count']}" for stage, s in sorted(snapshot["stages"].items())
+        ))
+    lines.append(
+        f"Discord: {delivery.sent} sent, {delivery.rate_limited}×429, {delivery.retries} retries · "
+        f"Sheets: {metrics.metrics.counter('sheets_requests_total'):g} requests, "
+        f"{metrics.metrics.counter('retries_total', service='sheets'):g} retries · "
+        f"SQLite: {metrics.metrics.counter('sqlite_queries_total'):g} queries"
+    )
+    if startup:
+        lines.append("Startup: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in startup.items()))
+    return "\n".join(lines)
+
+async def summarize_papers(papers: list[dict], report_channel=None) -> list[dict]:
+    """
+    Papers' metadata with long highlight cells summarised, several papers
+    at a time (SUMMARY_WORKERS). A paper whose summary fails keeps its
+    highlights as they are; the first failure is reported.
+    """
+    if not getattr(config, "OPENROUTER_API_KEY", ""):
+        if report_channel is not None:
+            await report_channel.send("⚠️ Set `OPENROUTER_API_KEY` in config.py to summarise highlights.")
+        return papers
+    from summarize import summarize_metadata
+
+    results = await asyncio.gather(*(run_summary(summarize_metadata, data) for data in papers), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors and report_channel is not None:
+        await report_channel.send(f"⚠️ Could not summarise {len(errors)} of {len(papers)} papers, sent them as they are: {errors[0]}")
+    return [data if isinstance(result, Exception) else result for data, result in zip(papers, results)]
+
+def build_sheet_row(data: dict) -> list:
+    """
+    A sheet row for a paper. The manual columns are None: blank when the
+    row is appended, and left as typed when it updates an existing row
+    (which the writer may only decide at flush time).
+    """
+    return [
+        config.USER_EMAIL,  # Email
+        data.get("title"),
+        None,  # Relevance (manual)
+        data.get("authors"),
+        data.get("year"),
+        data.get("venue"),
+        data.get("doi"),
+        None,  # Tag (manual)
+        data.get("claims"),
+        data.get("limitations"),
+        data.get("contributions"),
+        data.get("methodology"),
+        data.get("result"),
+        None,  # Links (manual)
+        None,  # Notes (manual)
+        data.get("itemKey"),  # Zotero key, to find the row again after edits (google_sheets.SHEET_KEY_COLUMN)
+    ]
+
+async def report_sheet_flush(channel, pending, row_number: int | None = None):
+    # The writer records the row in the ledger itself, even if it only lands on a retry
+    try:
+        written = await asyncio.wrap_future(pending)
+    except Exception as e:
+        await channel.send(f"⚠️ Google Sheet write failed ({e}); the row stays queued and will be retried.")
+        return
+    if row_number is not None and written == row_number:
+        await channel.send(f"✅ Row {written} updated in Google Sheet.")
+    else:
+        await channel.send("✅ Row added to Google Sheet successfully.")
 
 
 if __name__ == "__main__":
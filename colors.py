@@ -0,0 +1,102 @@
+import sqlite3
+import threading
+from typing import Iterable
+
+# Highlight colour -> category bucket. Every hex listed is a palette entry;
+# a colour is assigned to the nearest entry within MAX_DISTANCE.
+# Entries mapped to None are real Zotero colours we deliberately ignore,
+# so e.g. grey highlights aren't pulled into the nearest bucket.
+PALETTE: dict[str, str | None] = {
+    "#ffd400": "yellow",
+    "#5fb236": "green",
+    "#2ea8e5": "blue",
+    "#a28ae5": "purple",
+    "#ff6666": "red",
+    "#f19837": None,    # orange
+    "#e56eee": None,    # magenta
+    "#aaaaaa": None,    # grey
+}
+
+# Max Euclidean distance in RGB space to count as a palette colour
+MAX_DISTANCE = 150
+
+SQL_DISTINCT_COLORS = "SELECT DISTINCT color FROM itemAnnotations"
+
+
+def parse_hex(hex_color: str) -> tuple[int, int, int] | None:
+    if not hex_color or not hex_color.startswith("#"):
+        return None
+    h = hex_color.lstrip("#").lower()
+    if len(h) == 3:
+        h = "".join(ch * 2 for ch in h)
+    if len(h) != 6:
+        return None
+    try:
+        return int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16)
+    except ValueError:
+        return None
+
+
+class ColorClassifier:
+    """
+    Assigns raw colour strings to palette buckets.
+
+    Only a handful of distinct colour strings exist in a library, so each is
+    classified once and memoised in a lookup table; after that classifying
+    any number of annotations is a dict lookup per row.
+    """
+
+    def __init__(self, palette: dict[str, str | None] = PALETTE, max_distance: float = MAX_DISTANCE):
+        self.max_distance_sq = max_distance ** 2
+        self.entries = [(parse_hex(h), name) for h, name in palette.items() if parse_hex(h)]
+        self._table: dict[str | None, str | None] = {}
+        self._lock = threading.Lock()
+
+    def _nearest(self, hex_color: str) -> str | None:
+        rgb = parse_hex(hex_color)
+        if rgb is None:
+            return None
+        best_name, best_dist = None, None
+        for (r, g, b), name in self.entries:
+            dist = (rgb[0] - r) ** 2 + (rgb[1] - g) ** 2 + (rgb[2] - b) ** 2
+            if best_dist is None or dist < best_dist:
+                best_name, best_dist = name, dist
+        if best_dist is None or best_dist > self.max_distance_sq:
+            return None
+        return best_name
+
+    def classify(self, hex_color: str | None) -> str | None:
+        try:
+            return self._table[hex_color]
+        except KeyError:
+            name = self._nearest(hex_color) if hex_color else None
+            with self._lock:
+                self._table[hex_color] = name
+            return name
+
+    def classify_many(self, colors: Iterable[str | None]) -> list[str | None]:
+        """
+        Classify a whole column of colours at once.
+        """
+        table = self._table
+        colors = list(colors)
+        for c in set(colors).difference(table):
+            self.classify(c)
+        return [table[c] for c in colors]
+
+    def warm(self, conn: sqlite3.Connection) -> None:
+        """
+        Precompute the lookup table for every colour used in the database.
+        """
+        self.classify_many(row[0] for row in conn.execute(SQL_DISTINCT_COLORS))
+
+
+classifier = ColorClassifier()
+
+
+def hex_to_name(hex_color: str | None) -> str | None:
+    return classifier.classify(hex_color)
+
+
+def classify_many(colors: Iterable[str | None]) -> list[str | None]:
+    return classifier.classify_many(colors)
@@ -29,4 +29,51 @@ SERVICE_ACCOUNT_FILE = '' # Path to your service account JSON file
 SPREADSHEET_ID = ""  # <- update this
 SHEET_NAME = ""  # <- or whatever the name of your tab is
 
-OPENROUTER_API_KEY = ""
\ No newline at end of file
+OPENROUTER_API_KEY = ""
+
+# Highlight summaries (optional): condense long sheet cells with \push <key> --summarize
+SUMMARY_MODE = False          # always on for \push / \pushall
+SUMMARY_MODEL = "openai/gpt-4o-mini"
+SUMMARY_MIN_BULLETS = 8       # cells with fewer highlights are kept as they are
+SUMMARY_MAX_BULLETS = 6       # bullets per summarised cell
+SUMMARY_WORKERS = 4           # papers summarised at once
+
+# Concurrency (optional)
+DB_WORKERS = 4                # threads serving Zotero DB reads
+SHEETS_WORKERS = 2            # threads serving Google Sheets writes
+MAX_CONCURRENT_COMMANDS = 8   # \pull / \push commands processed at once
+
+# Batched Google Sheets writer (optional)
+SHEETS_SPOOL_PATH = "sheets_spool.jsonl"   # rows queued but not yet flushed
+SHEETS_FLUSH_MAX_ROWS = 25                 # flush when this many rows are queued...
+SHEETS_FLUSH_INTERVAL = 5.0                # ...or this many seconds after the first one
+SHEETS_FAILED_RETRY_DELAY = 60.0           # a batch that failed is kept and retried after this long
+
+# Watcher mode (optional): auto-post new highlights without \pull
+WATCH_ZOTERO = False
+WATCH_POLL_INTERVAL = 2.0   # seconds between cheap file checks
+WATCH_DEBOUNCE = 3.0        # wait until Zotero has stopped writing for this long
+
+# Discord delivery (optional)
+DISCORD_USE_EMBEDS = False   # pack highlights into embeds (6,000 chars/message) instead of plain text
+
+# Metrics (optional)
+METRICS_PORT = None      # e.g. 9464 to serve Prometheus metrics at http://127.0.0.1:9464/metrics
+SLOW_COMMAND_MS = None   # e.g. 2000 to print a per-stage breakdown of commands slower than this
+
+# Image annotations (optional; install Pillow to resize images that are too large)
+PULL_IMAGES = True           # send figure/table snips from Zotero's image annotations with \pull
+IMAGE_CACHE_DIR = "image_cache"
+IMAGE_MAX_SIDE = 1600        # px, longest side after resizing
+IMAGE_MAX_BYTES = 1_000_000  # per image
+IMAGE_WORKERS = 2            # processes resizing images
+
+# Local HTTP API (optional): JSON view of items for notebooks and dashboards, see api.py
+API_PORT = None          # e.g. 8765 to serve it from the bot; or run `python api.py` on its own
+API_HOST = "127.0.0.1"
+
+# Sentence context (optional): expand highlights to whole sentences from Zotero's full-text cache
+CONTEXT_MODE = False     # always on; otherwise only for \pull / \push <key> --context
+
+# Merge overlapping or touching highlights of the same colour on a page into one bullet
+MERGE_HIGHLIGHTS = True
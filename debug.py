@@ -32,15 +32,17 @@ def clear_log():
 
 def lookup_item_id(conn: sqlite3.Connection, item_key: str) -> int | None:
     """
-    Return itemID from 'items' table where key = item_key and itemTypeID = 35 (attachment).
+    Return itemID from 'items' table where key = item_key and the item is an attachment.
+    The attachment itemTypeID differs between Zotero versions, so match it by name.
     If not found, return None.
     """
     cur = conn.cursor()
     cur.execute("""
-        SELECT itemID
+        SELECT items.itemID
         FROM items
-        WHERE key = ?
-          AND itemTypeID = 35
+        JOIN itemTypesCombined USING (itemTypeID)
+        WHERE items.key = ?
+          AND itemTypesCombined.typeName = 'attachment'
     """, (item_key,))
     row = cur.fetchone()
     return row[0] if row else None
@@ -120,7 +122,7 @@ def main():
         paper_id = lookup_item_id(conn, item_key)
         if not paper_id:
             log(f"⚠️ No itemID found for key '{item_key}'.")
-            log("   → Possible reasons: invalid key, or this item is not a PDF attachment (itemTypeID ≠ 35).")
+            log("   → Possible reasons: invalid key, or this item is not a PDF attachment (not an attachment item).")
             conn.close()
             return
 
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import time
+
+import discord
+
+import metrics
+
+MAX_CONTENT = 2000          # characters per message
+MAX_EMBED_DESCRIPTION = 4096
+MAX_EMBEDS_TOTAL = 6000     # characters across all embeds of one message
+MAX_EMBEDS = 10             # embeds per message
+MAX_FILES = 10              # attachments per message
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024  # total attachment size per message
+
+# Discord allows about 5 messages per 5 seconds per channel and 50 requests
+# per second overall; stay just inside both so sends never hit a 429.
+CHANNEL_RATE = (5, 5.0)
+GLOBAL_RATE = (45, 1.0)
+MAX_RETRIES = 5
+
+
+def _split_long(text: str, limit: int) -> list[str]:
+    """
+    Split text into pieces of at most `limit` chars, preferring whitespace.
+    """
+    pieces = []
+    while len(text) > limit:
+        cut = text.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip()
+    pieces.append(text)
+    return pieces
+
+
+def _pack(intro: str, texts: list[str], limit: int) -> list[str]:
+    # Intro heads the first chunk, then numbered bullets packed up to `limit`
+    chunks, current = [], intro
+    for idx, text in enumerate(texts, start=1):
+        for line in _split_long(f"{idx}. {text}", limit):
+            if current and len(current) + 1 + len(line) > limit:
+                chunks.append(current)
+                current = line
+            else:
+                current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def pack_messages(intro: str, texts: list[str], limit: int = MAX_CONTENT) -> list[dict]:
+    """
+    Pack the intro and numbered bullets into as few messages as possible,
+    ending with the blank separator line when it fits. Returns send()
+    keyword dicts.
+    """
+    chunks = _pack(intro, texts, limit)
+    if len(chunks[-1]) + 2 <= limit:
+        chunks[-1] += "\n\u200b"
+    return [{"content": chunk} for chunk in chunks]
+
+
+def pack_embeds(intro: str, texts: list[str]) -> list[dict]:
+    """
+    Like pack_messages, but puts bullets in embeds: up to 10 per message and
+    6,000 characters in total, with the intro as the first message's content.
+    """
+    descriptions = _pack("", texts, MAX_EMBED_DESCRIPTION)
+    messages, embeds, total = [], [], 0
+    for description in descriptions:
+        if embeds and (len(embeds) == MAX_EMBEDS or total + len(description) > MAX_EMBEDS_TOTAL):
+            messages.append({"embeds": embeds})
+            embeds, total = [], 0
+        embeds.append(discord.Embed(description=description))
+        total += len(description)
+    if embeds:
+        messages.append({"embeds": embeds})
+    if messages:
+        messages[0]["content"] = intro
+    else:
+        messages.append({"content": intro})
+    return messages
+
+
+def pack_files(intro: str | None, files: list[tuple[str, str, int]]) -> list[dict]:
+    """
+    Group (path, filename, size) files into as few messages as possible, up
+    to MAX_FILES and MAX_UPLOAD_BYTES each, with the intro (if any) as the
+    first message's content. Files are given as "attachments" [path, name]
+    pairs and only opened when sent, so the dicts stay JSON-serialisable.
+    """
+    messages, batch, total = [], [], 0
+    for path, name, size in files:
+        if batch and (len(batch) == MAX_FILES or total + size > MAX_UPLOAD_BYTES):
+            messages.append({"attachments": batch})
+            batch, total = [], 0
+        batch.append([path, name])
+        total += size
+    if batch:
+        messages.append({"attachments": batch})
+    if messages and intro:
+        messages[0]["content"] = intro
+    return messages
+
+
+def messages_to_json(messages: list[dict]) -> list[dict]:
+    """
+    send() keyword dicts in a JSON-serialisable form (embeds as dicts).
+    """
+    return [
+        {**kwargs, "embeds": [e.to_dict() for e in kwargs["embeds"]]} if "embeds" in kwargs else kwargs
+        for kwargs in messages
+    ]
+
+
+def messages_from_json(data: list[dict]) -> list[dict]:
+    return [
+        {**kwargs, "embeds": [discord.Embed.from_dict(e) for e in kwargs["embeds"]]} if "embeds" in kwargs else kwargs
+        for kwargs in data
+    ]
+
+
+class RateBucket:
+    """
+    Sliding-window limiter: at most `limit` acquisitions per `per` seconds.
+    """
+
+    def __init__(self, limit: int, per: float):
+        self.limit = limit
+        self.per = per
+        self._sent: list[float] = []
+        self._lock = asyncio.Lock()
+        self._blocked_until = 0.0
+
+    def block_for(self, seconds: float) -> None:
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._sent = [t for t in self._sent if now - t < self.per]
+                if len(self._sent) < self.limit:
+                    self._sent.append(now)
+                    return
+                await asyncio.sleep(self.per - (now - self._sent[0]))
+
+
+class Delivery:
+    """
+    One queue per channel, each drained by its own task, so different
+    channels are sent to concurrently while messages within a channel stay
+    in order. Every send first takes a token from the channel's bucket and
+    the global bucket; a 429 that still gets through pauses that channel
+    for the advertised retry_after.
+    """
+
+    def __init__(self):
+        self._queues: dict[int, asyncio.Queue] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self._buckets: dict[int, RateBucket] = {}
+        self._global = RateBucket(*GLOBAL_RATE)
+        self.sent = 0
+        self.rate_limited = 0
+        self.retries = 0
+
+    def submit(self, channel, messages: list[dict]) -> asyncio.Future:
+        """
+        Queue messages for a channel; the future resolves once all are sent.
+        """
+        done = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(channel.id)
+        if queue is None:
+            queue = self._queues[channel.id] = asyncio.Queue()
+            self._buckets[channel.id] = RateBucket(*CHANNEL_RATE)
+        # The drain task outlives the submitting command, so carry its trace along
+        queue.put_nowait((channel, messages, done, metrics.current_trace()))
+        worker = self._workers.get(channel.id)
+        if worker is None or worker.done():
+            self._workers[channel.id] = asyncio.create_task(self._drain(channel.id))
+        return done
+
+    async def _send(self, channel, kwargs: dict) -> None:
+        bucket = self._buckets[channel.id]
+        for attempt in range(MAX_RETRIES + 1):
+            await bucket.acquire()
+            await self._global.acquire()
+            started = time.perf_counter()
+            try:
+                if "attachments" in kwargs:
+                    # discord.File is consumed by a send, so open the files afresh on every attempt
+                    files = [discord.File(path, filename=name) for path, name in kwargs["attachments"]]
+                    send_kwargs = {k: v for k, v in kwargs.items() if k != "attachments"}
+                    await channel.send(**send_kwargs, files=files)
+                else:
+                    await channel.send(**kwargs)
+                self.sent += 1
+                metrics.metrics.inc("discord_messages_total")
+                return
+            except discord.HTTPException as e:
+                # Only reached once discord.py has given up retrying a 429 itself;
+                # the 429s it retried were already counted by RateLimitCounter
+                if e.status != 429 or attempt == MAX_RETRIES:
+                    raise
+                self.retries += 1
+                metrics.count_retry("discord", rate_limited=False)
+                bucket.block_for(getattr(e, "retry_after", None) or 2 ** attempt)
+            finally:
+                metrics.record_stage("discord", time.perf_counter() - started)
+
+    async def _drain(self, channel_id: int) -> None:
+        queue = self._queues[channel_id]
+        while not queue.empty():
+            channel, messages, done, trace = queue.get_nowait()
+            try:
+                with metrics.activate(trace):
+                    for kwargs in messages:
+                        await self._send(channel, kwargs)
+                if not done.done():
+                    done.set_result(len(messages))
+            except Exception as e:
+                if not done.done():
+                    done.set_exception(e)
+
+
+class RateLimitCounter(logging.Handler):
+    """
+    Counts the 429s discord.py retries inside its HTTP client. Those never
+    reach Delivery as exceptions; discord.http only logs a warning for
+    each, so this handler on that logger is where they can be seen.
+    """
+
+    def __init__(self, delivery: Delivery):
+        super().__init__(logging.WARNING)
+        self.delivery = delivery
+
+    def emit(self, record: logging.LogRecord) -> None:
+        message = record.getMessage()
+        if "responded with 429" in message or "Global rate limit has been hit" in message:
+            self.delivery.rate_limited += 1
+            self.delivery.retries += 1
+            metrics.count_retry("discord")
+
+
+delivery = Delivery()
+logging.getLogger("discord.http").addHandler(RateLimitCounter(delivery))
@@ -0,0 +1,193 @@
+# export.py
+#
+# Stream every highlight in the library, joined with its paper's metadata,
+# to JSONL, CSV or Parquet. Papers are read in fixed-size chunks, so memory
+# stays flat however big the library is, and a checkpoint written after
+# every chunk lets an interrupted export pick up where it stopped.
+#
+#   python export.py highlights.jsonl
+#   python export.py highlights.csv --format csv --resume
+#   python export.py highlights.parquet --format parquet
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+import zotero_reader
+
+COLUMNS = [
+    "paper_id", "title", "authors", "year", "venue", "doi",
+    "attachment_key", "annotation_id", "color", "page_label", "text", "comment",
+]
+
+DEFAULT_CHUNK = 500  # papers per read
+
+
+def iter_chunks(reader: zotero_reader.ZoteroReader, after_id: int, chunk_size: int):
+    """
+    Yield (last paper id, rows) per chunk of papers with a PDF, in itemID order.
+    """
+    while True:
+        paper_ids = reader.pdf_parent_ids_after(after_id, chunk_size)
+        if not paper_ids:
+            return
+        metadata = reader.load_metadata(paper_ids)
+        highlights = reader.paper_highlights(paper_ids)
+        rows = []
+        for pid in paper_ids:
+            meta = metadata[pid]
+            for h in highlights[pid]:
+                rows.append([
+                    pid, meta["title"], meta["authors"], meta["year"], meta["venue"], meta["doi"],
+                    h["attachmentKey"], h["itemID"], h["color"], h["pageLabel"], h["text"], h["comment"],
+                ])
+        after_id = paper_ids[-1]
+        yield after_id, rows
+
+
+class JsonlSink:
+    def __init__(self, path: str, offset: int | None):
+        self.f = open(path, "r+b" if offset is not None else "wb")
+        if offset is not None:
+            self.f.truncate(offset)
+            self.f.seek(offset)
+
+    def write(self, rows: list[list]) -> None:
+        for row in rows:
+            self.f.write((json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def commit(self) -> dict:
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return {"offset": self.f.tell()}
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class CsvSink:
+    def __init__(self, path: str, offset: int | None):
+        self.f = open(path, "r+" if offset is not None else "w", encoding="utf-8", newline="")
+        if offset is not None:
+            self.f.truncate(offset)
+            self.f.seek(offset)
+        self.writer = csv.writer(self.f)
+        if offset is None:
+            self.writer.writerow(COLUMNS)
+
+    def write(self, rows: list[list]) -> None:
+        self.writer.writerows(rows)
+
+    def commit(self) -> dict:
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        return {"offset": self.f.tell()}
+
+    def close(self) -> None:
+        self.f.close()
+
+
+class ParquetSink:
+    """
+    Writes a Parquet dataset directory with one part file per chunk, so a
+    crash never leaves a half-written file behind and resuming just adds parts.
+    """
+
+    def __init__(self, path: str, part: int | None):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("❌ Parquet export needs pyarrow: pip install pyarrow")
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.part = part or 0
+        os.makedirs(path, exist_ok=True)
+        self.schema = pa.schema([
+            ("paper_id", pa.int64()), ("title", pa.string()), ("authors", pa.string()),
+            ("year", pa.string()), ("venue", pa.string()), ("doi", pa.string()),
+            ("attachment_key", pa.string()), ("annotation_id", pa.int64()), ("color", pa.string()),
+            ("page_label", pa.string()), ("text", pa.string()), ("comment", pa.string()),
+        ])
+
+    def write(self, rows: list[list]) -> None:
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        table = self.pa.table(
+            {name: self.pa.array(col, type=self.schema.field(name).type) for name, col in zip(COLUMNS, columns)},
+            schema=self.schema,
+        )
+        self.pq.write_table(table, os.path.join(self.path, f"part-{self.part:05d}.parquet"))
+        self.part += 1
+
+    def commit(self) -> dict:
+        return {"part": self.part}
+
+    def close(self) -> None:
+        pass
+
+
+def export(out_path: str, fmt: str, resume: bool = False, chunk_size: int = DEFAULT_CHUNK,
+           reader: zotero_reader.ZoteroReader | None = None) -> int:
+    reader = reader or zotero_reader.get_reader()
+    checkpoint_path = out_path + ".checkpoint.json"
+
+    checkpoint = None
+    if resume and os.path.isfile(checkpoint_path):
+        with open(checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("format") != fmt:
+            sys.exit(f"❌ Checkpoint is for format '{checkpoint.get('format')}', not '{fmt}'.")
+        print(f"↻ Resuming after paper {checkpoint['after_id']} ({checkpoint['rows']} rows already written)")
+
+    if fmt == "jsonl":
+        sink = JsonlSink(out_path, checkpoint["offset"] if checkpoint else None)
+    elif fmt == "csv":
+        sink = CsvSink(out_path, checkpoint["offset"] if checkpoint else None)
+    else:
+        sink = ParquetSink(out_path, checkpoint["part"] if checkpoint else None)
+
+    after_id = checkpoint["after_id"] if checkpoint else 0
+    total = checkpoint["rows"] if checkpoint else 0
+    try:
+        for after_id, rows in iter_chunks(reader, after_id, chunk_size):
+            sink.write(rows)
+            total += len(rows)
+            state = {"format": fmt, "after_id": after_id, "rows": total, **sink.commit()}
+            tmp = checkpoint_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, checkpoint_path)
+            print(f"  … {total} rows (papers up to itemID {after_id})")
+    finally:
+        sink.close()
+
+    if os.path.isfile(checkpoint_path):
+        os.remove(checkpoint_path)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export all Zotero highlights with paper metadata.")
+    parser.add_argument("out", help="output file (or directory for parquet)")
+    parser.add_argument("--format", choices=["jsonl", "csv", "parquet"], help="default: from the file extension")
+    parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="papers per read (default: %(default)s)")
+    parser.add_argument("--db", help="path to zotero.sqlite (default: zotero_reader.ZOTERO_DB_PATH)")
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.out)[1].lstrip(".").lower()
+    if fmt not in ("jsonl", "csv", "parquet"):
+        parser.error("can't tell the format from the file name; pass --format")
+    if args.db:
+        zotero_reader.ZOTERO_DB_PATH = args.db
+
+    total = export(args.out, fmt, args.resume, args.chunk)
+    print(f"✅ Exported {total} highlights to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import mmap
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+# Zotero writes each attachment's extracted text to storage/<key>/.zotero-ft-cache
+FT_CACHE_NAME = ".zotero-ft-cache"
+INDEX_CACHE_SIZE = 32       # documents whose offset index is kept in memory
+MIN_MATCH_CHARS = 12        # shorter highlights are too ambiguous to locate
+MAX_CONTEXT_CHARS = 1200    # keep the bare highlight if its sentences run longer
+NO_SPACE_BEFORE = ".,;:!?)]\"'"
+
+WORD = re.compile(rb"\w+")
+# End of a sentence (punctuation, closing quotes/brackets, whitespace) or a blank line
+SENTENCE_END = re.compile(rb"[.!?][\"')\]]*\s+|\n\s*\n")
+# "e.g.", "et al.", "Fig.", initials ... don't end a sentence
+ABBREVIATION = re.compile(
+    rb"(?:\b(?:e\.g|i\.e|al|fig|figs|eq|eqs|vs|cf|etc|approx|ref|refs|sec|no|resp|ca)|\b[A-Z])\.$", re.IGNORECASE
+)
+
+
+def _clean(raw: bytes) -> str:
+    text = raw.decode("utf-8", "replace")
+    text = re.sub(r"(\w)-\s*\n\s*(\w)", r"\1\2", text)  # words hyphenated across lines
+    return " ".join(text.split())
+
+
+def _skeleton(data: bytes) -> bytes:
+    # Lower-cased word characters only, so line breaks, hyphenation and
+    # punctuation differences between the highlight and the text don't matter
+    return b"".join(m.group().lower() for m in WORD.finditer(data))
+
+
+class DocumentIndex:
+    """
+    Offsets into one .zotero-ft-cache file, built in a single pass:
+    a search skeleton (word characters only) with the byte offset of every
+    word, and the byte offset of every sentence start. Locating and
+    expanding a highlight is then a find() in the skeleton plus a few
+    bisects, however many highlights a document has.
+    """
+
+    def __init__(self, data):
+        self.size = len(data)
+        word_starts, skel_starts, parts, length = array("q"), array("q"), [], 0
+        for m in WORD.finditer(data):
+            word = m.group()
+            word_starts.append(m.start())
+            skel_starts.append(length)
+            parts.append(word.lower())
+            length += len(word)
+        self.skeleton = b"".join(parts)
+        self.word_starts = word_starts
+        self.skel_starts = skel_starts
+
+        sentence_starts = array("q", [0])
+        for m in SENTENCE_END.finditer(data):
+            if m.group()[:1] == b"." and ABBREVIATION.search(data[max(0, m.start() - 8):m.start() + 1]):
+                continue
+            sentence_starts.append(m.end())
+        self.sentence_starts = sentence_starts
+
+    def _to_offset(self, skel_pos: int) -> int:
+        i = bisect_right(self.skel_starts, skel_pos) - 1
+        return self.word_starts[i] + (skel_pos - self.skel_starts[i])
+
+    def locate(self, needle: bytes, hint: int = 0) -> tuple[int, int, int] | None:
+        """
+        (start, end) byte offsets of a skeleton needle in the document, plus
+        the hint for the next search. Highlights arrive in reading order, so
+        searching from the previous match first keeps the total work linear.
+        """
+        pos = self.skeleton.find(needle, hint)
+        if pos < 0 and hint:
+            pos = self.skeleton.find(needle)
+        if pos < 0:
+            return None
+        end = pos + len(needle)
+        return self._to_offset(pos), self._to_offset(end - 1) + 1, end
+
+    def sentences(self, start: int, end: int) -> tuple[int, int]:
+        """
+        Byte range of the whole sentences covering [start, end).
+        """
+        first = self.sentence_starts[bisect_right(self.sentence_starts, start) - 1]
+        k = bisect_left(self.sentence_starts, end)
+        return first, self.sentence_starts[k] if k < len(self.sentence_starts) else self.size
+
+
+class ContextExpander:
+    """
+    Expands highlights to the sentences around them, using each
+    attachment's full-text cache. Files are memory-mapped only while a
+    batch is expanded (so Zotero can still rewrite them); the offset
+    indexes are kept in an LRU keyed by path, size and mtime.
+    """
+
+    def __init__(self, max_documents: int = INDEX_CACHE_SIZE):
+        self.max_documents = max_documents
+        self._indexes: OrderedDict[str, tuple[tuple, DocumentIndex]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _index(self, path: str, stamp: tuple, data) -> DocumentIndex:
+        with self._lock:
+            cached = self._indexes.get(path)
+            if cached is not None and cached[0] == stamp:
+                self._indexes.move_to_end(path)
+                return cached[1]
+        index = DocumentIndex(data)
+        with self._lock:
+            self._indexes[path] = (stamp, index)
+            self._indexes.move_to_end(path)
+            while len(self._indexes) > self.max_documents:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _expand_document(self, path: str, annotations: list[dict], mark: str) -> None:
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            if not st.st_size:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                index = self._index(path, (st.st_size, st.st_mtime_ns), mm)
+                hint = 0
+                for ann in annotations:
+                    needle = _skeleton(ann["text"].encode("utf-8"))
+                    if len(needle) < MIN_MATCH_CHARS:
+                        continue
+                    found = index.locate(needle, hint)
+                    if found is None:
+                        continue
+                    start, end, hint = found
+                    first, last = index.sentences(start, end)
+                    if last - first > MAX_CONTEXT_CHARS:
+                        continue
+                    before, after = _clean(mm[first:start]), _clean(mm[end:last])
+                    text = f"{before} " if before else ""
+                    text += f"{mark}{_clean(mm[start:end])}{mark}"
+                    if after:
+                        text += after if after[0] in NO_SPACE_BEFORE else f" {after}"
+                    ann["text"] = text
+
+    def expand(self, annotations: list[dict], paths: dict[int, str], mark: str = "") -> list[dict]:
+        """
+        Copies of the annotations with each text replaced by the whole
+        sentences it occurs in, the highlighted part wrapped in `mark`
+        (e.g. "**"). `paths` maps attachmentID -> .zotero-ft-cache path;
+        highlights that can't be found keep their own text.
+        """
+        expanded = [dict(ann) for ann in annotations]
+        by_attachment: dict[int, list[dict]] = {}
+        for ann in expanded:
+            by_attachment.setdefault(ann.get("attachmentID"), []).append(ann)
+        for attach_id, group in by_attachment.items():
+            if attach_id in paths:
+                self._expand_document(paths[attach_id], group, mark)
+        return expanded
+
+
+expander = ContextExpander()
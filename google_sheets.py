@@ -1,6 +1,16 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
 import gspread
+import requests
+from google.auth.exceptions import TransportError
 from google.oauth2.service_account import Credentials
 import config
+import metrics
 
 # Step 1: Set up the path to your service account credentials
 SERVICE_ACCOUNT_FILE = config.SERVICE_ACCOUNT_FILE  # rename if needed
@@ -14,16 +24,417 @@ SCOPES = [
 # Step 3: Define your Google Sheet ID and target worksheet name
 # keys in config
 
-# Step 4: Setup the client
-credentials = Credentials.from_service_account_file(
-    SERVICE_ACCOUNT_FILE, scopes=SCOPES
-)
-client = gspread.authorize(credentials)
+# Batched writer tuning (override in config.py)
+SPOOL_PATH = getattr(config, "SHEETS_SPOOL_PATH", "sheets_spool.jsonl")
+FLUSH_MAX_ROWS = getattr(config, "SHEETS_FLUSH_MAX_ROWS", 25)
+FLUSH_INTERVAL = getattr(config, "SHEETS_FLUSH_INTERVAL", 5.0)   # seconds
+MAX_BATCH_ROWS = 500                                             # rows per append_rows request
+MAX_RETRIES = 6
+FAILED_RETRY_DELAY = getattr(config, "SHEETS_FAILED_RETRY_DELAY", 60.0)   # seconds before a failed batch is retried
+# Checked before a row is updated in place (see bot.build_sheet_row): the
+# Zotero item key, or the title for rows written before the key column existed
+SHEET_KEY_COLUMN = 15
+SHEET_TITLE_COLUMN = 1
+
+# Identifies the target sheet in the publishing ledger (see ledger.py)
+LEDGER_SHEET = f"{config.SPREADSHEET_ID}/{config.SHEET_NAME}"
+
+# Step 4: Setup the client (lazily: nothing is read or authorized until first use)
+_client = None
+_worksheet = None
+_worksheet_lock = threading.Lock()
+
+def get_client():
+    """
+    Returns the authorized gspread client, loading the service-account
+    credentials on first use. Access tokens are refreshed by google-auth
+    when they expire; see also _reset_client.
+    """
+    global _client
+    with _worksheet_lock:
+        if _client is None:
+            credentials = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+            _client = gspread.authorize(credentials)
+        return _client
+
+def get_worksheet():
+    """
+    Returns the configured worksheet, opening it only once per process.
+    """
+    global _worksheet
+    client = get_client()
+    with _worksheet_lock:
+        if _worksheet is None:
+            _worksheet = client.open_by_key(config.SPREADSHEET_ID).worksheet(config.SHEET_NAME)
+        return _worksheet
+
+def _reset_client() -> None:
+    # A 401 means the token was revoked or expired mid-flight; authorize afresh
+    global _client, _worksheet
+    with _worksheet_lock:
+        _client = None
+        _worksheet = None
+
+def warm_up() -> None:
+    """
+    Authorize, fetch a token and open the worksheet ahead of the first
+    \\push, and replay any rows left in the spool by the previous run.
+    Blocking; run it on the Sheets executor.
+    """
+    get_worksheet()
+    get_writer()
+
+def _status(e: gspread.exceptions.APIError) -> int | None:
+    return getattr(getattr(e, "response", None), "status_code", None)
+
+def _is_retryable(e: gspread.exceptions.APIError) -> bool:
+    status = _status(e)
+    return status == 429 or (status is not None and status >= 500)
+
+def _with_backoff(call, stage: str = "sheets_append"):
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            metrics.metrics.inc("sheets_requests_total")
+            with metrics.stage(stage):
+                return call()
+        except gspread.exceptions.APIError as e:
+            if _status(e) == 401 and attempt < MAX_RETRIES:
+                _reset_client()
+                metrics.count_retry("sheets", rate_limited=False)
+                continue
+            if attempt == MAX_RETRIES or not _is_retryable(e):
+                raise
+            metrics.count_retry("sheets", rate_limited=_status(e) == 429)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, TransportError):
+            # Network blip (or token endpoint unreachable): same backoff as a 5xx
+            if attempt == MAX_RETRIES:
+                raise
+            metrics.count_retry("sheets", rate_limited=False)
+        time.sleep(min(2 ** attempt, 64) + random.random())
+
+def append_rows_with_backoff(rows: list[list[str]]) -> dict:
+    """
+    Appends rows in one request, backing off exponentially on 429 / 5xx.
+    """
+    return _with_backoff(lambda: get_worksheet().append_rows(rows, value_input_option="USER_ENTERED"))
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord("A") + rem) + letters
+    return letters
+
+def _row_ranges(row_number: int, row: list) -> list[dict]:
+    # One range per run of consecutive non-None cells; None leaves a cell as is
+    ranges, start = [], None
+    for i, value in enumerate(row + [None]):
+        if value is not None and start is None:
+            start = i
+        elif value is None and start is not None:
+            ranges.append({
+                "range": f"{_column_letter(start)}{row_number}:{_column_letter(i - 1)}{row_number}",
+                "values": [row[start:i]],
+            })
+            start = None
+    return ranges
+
+def update_rows_with_backoff(updates: list[tuple[int, list]]) -> list[bool]:
+    """
+    Overwrites existing rows in place with one batch_get (to check each row
+    still holds the same paper, in case the sheet was sorted or edited) and
+    one batch_update. A row holds the same paper if its item key matches;
+    rows without a key yet are matched by title. Cells given as None are
+    left untouched. Returns, per update, whether it was applied.
+    """
+    if not updates:
+        return []
+    key_column, title_column = _column_letter(SHEET_KEY_COLUMN), _column_letter(SHEET_TITLE_COLUMN)
+    ranges = [cell for n, _ in updates for cell in (f"{key_column}{n}", f"{title_column}{n}")]
+    current = _with_backoff(lambda: get_worksheet().batch_get(ranges), "sheets_update")
+
+    def value(cells) -> str:
+        return cells[0][0] if cells and cells[0] else ""
+
+    applied, data = [], []
+    for i, (row_number, row) in enumerate(updates):
+        existing_key, existing_title = value(current[2 * i]), value(current[2 * i + 1])
+        key = row[SHEET_KEY_COLUMN] if len(row) > SHEET_KEY_COLUMN else None
+        if key and existing_key:
+            ok = existing_key == key
+        else:
+            title = row[SHEET_TITLE_COLUMN]
+            ok = title is None or existing_title == (title or "")
+        applied.append(ok)
+        if ok:
+            data.extend(_row_ranges(row_number, row))
+    if data:
+        _with_backoff(lambda: get_worksheet().batch_update(data, value_input_option="USER_ENTERED"), "sheets_update")
+    return applied
+
+def _first_appended_row(response: dict) -> int | None:
+    # "Sheet1!A12:O14" -> 12
+    updated = (response or {}).get("updates", {}).get("updatedRange", "")
+    cell = updated.split("!")[-1].split(":")[0]
+    digits = "".join(ch for ch in cell if ch.isdigit())
+    return int(digits) if digits else None
+
+
+class SheetWriter:
+    """
+    Collects rows in memory and flushes them with a single append_rows call
+    (plus one batch_update for rows that overwrite an existing row) once
+    FLUSH_MAX_ROWS rows are queued or FLUSH_INTERVAL seconds have passed.
+
+    Queued rows are also written to an on-disk spool, so rows that were
+    accepted but not yet flushed survive a crash and are sent on restart.
+    A batch that fails even after retrying stays queued and spooled and is
+    tried again FAILED_RETRY_DELAY seconds later (or on the next start).
+    A spool line is either a row (append) or {"row": [...], "update": n,
+    "parent_id": id}. Rows that carry their paper's parent_id have the row
+    they were written to recorded in the publishing ledger when their
+    batch commits, however late that is. Such a row without a row number
+    updates the row the ledger has for its paper at flush time, and
+    several rows for one paper in a batch are written once (the latest),
+    so two quick \\push of the same paper can't both append.
+    """
+
+    def __init__(self, spool_path: str = SPOOL_PATH, max_rows: int = FLUSH_MAX_ROWS,
+                 interval: float = FLUSH_INTERVAL, append=append_rows_with_backoff,
+                 update=update_rows_with_backoff, ledger=None):
+        self.spool_path = spool_path
+        self.max_rows = max_rows
+        self.interval = interval
+        self._append = append
+        self._update = update
+        self._ledger = ledger  # default: ledger.get_ledger(), opened on first flush
+        self._cond = threading.Condition()
+        self._pending: list[tuple[list | dict, Future]] = []
+        self._oldest: float | None = None
+        self._retry_at = 0.0
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self._replay_spool()
+
+    def _replay_spool(self) -> None:
+        if not os.path.isfile(self.spool_path):
+            return
+        with open(self.spool_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    self._pending.append((json.loads(line), Future()))
+        if self._pending:
+            self._oldest = time.monotonic()
+            self._start()
+
+    def _write_spool(self) -> None:
+        # Rewrite the spool with whatever is still pending (called under the lock)
+        tmp = self.spool_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for row, _ in self._pending:
+                f.write(json.dumps(row) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.spool_path)
+
+    def _start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="sheets-writer", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, row: list[str], row_number: int | None = None, parent_id: int | None = None) -> Future:
+        """
+        Queue a row; the returned future resolves with the row's number in
+        the sheet once the batch containing it has been committed.
+
+        With row_number, the row overwrites that existing row instead of
+        being appended (cells given as None are left as they are). If that
+        row no longer holds the same paper, it is appended after all.
+        With parent_id, the row it ends up in is recorded in the ledger.
+        """
+        return self.enqueue_many([row], [row_number], [parent_id])[0]
+
+    def enqueue_many(self, rows: list[list[str]], row_numbers: list[int | None] | None = None,
+                     parent_ids: list[int | None] | None = None) -> list[Future]:
+        """
+        Queue several rows at once (one spool write, one future per row).
+        """
+        entries = []
+        for row, row_number, parent_id in zip(rows, row_numbers or [None] * len(rows),
+                                              parent_ids or [None] * len(rows)):
+            entry = {"row": row}
+            if row_number is not None:
+                entry["update"] = row_number
+            if parent_id is not None:
+                entry["parent_id"] = parent_id
+            entries.append(entry)
+        futures = [Future() for _ in rows]
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SheetWriter is closed")
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(entry) + "\n" for entry in entries))
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending.extend(zip(entries, futures))
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            self._start()
+            self._cond.notify()
+        return futures
+
+    def _take_batch(self) -> list[tuple[list | dict, Future]]:
+        with self._cond:
+            while True:
+                if self._pending:
+                    now = time.monotonic()
+                    if not self._closed and now < self._retry_at:
+                        self._cond.wait(self._retry_at - now)
+                        continue
+                    due = self._oldest + self.interval
+                    if self._closed or len(self._pending) >= self.max_rows or now >= due:
+                        break
+                    self._cond.wait(max(0.0, due - now))
+                elif self._closed:
+                    return []
+                else:
+                    self._cond.wait()
+            return self._pending[:MAX_BATCH_ROWS]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            try:
+                results = self._flush([entry for entry, _ in batch])
+                error = None
+            except Exception as e:
+                results, error = None, e
+
+            with self._cond:
+                if error is None:
+                    del self._pending[:len(batch)]
+                    self._oldest = time.monotonic() if self._pending else None
+                    self._write_spool()
+                else:
+                    # Keep the rows (the spool still has them) and try again later;
+                    # whoever is waiting on them learns of the failure now
+                    self._pending[:len(batch)] = [(entry, Future()) for entry, _ in batch]
+                    self._retry_at = time.monotonic() + FAILED_RETRY_DELAY
+                    metrics.metrics.inc("sheets_failed_batches_total")
+
+            for i, (_, future) in enumerate(batch):
+                if error is None:
+                    future.set_result(results[i])
+                else:
+                    future.set_exception(error)
+            if error is not None and self._closed:
+                return  # left in the spool for the next start
+
+    def _ledger_rows(self):
+        if self._ledger is None:
+            from ledger import get_ledger
+            self._ledger = get_ledger()
+        return self._ledger
+
+    def _record(self, rows: dict[int, int]) -> None:
+        if not rows:
+            return
+        try:
+            self._ledger_rows().set_sheet_rows(LEDGER_SHEET, rows)
+        except Exception as e:
+            # The rows are in the sheet; failing the batch now would append them twice
+            print(f"⚠️ Could not record sheet rows in the ledger: {e}")
+
+    def _coalesce(self, entries: list[dict]) -> tuple[list[dict], list[int]]:
+        # One entry per paper: the latest row, with the row number the ledger
+        # (or any of its entries) has for it. Returns the entries to write
+        # and, per original entry, the index of the one written for it.
+        parent_ids = {entry["parent_id"] for entry in entries if entry.get("parent_id") is not None}
+        known = self._ledger_rows().sheet_rows(LEDGER_SHEET, list(parent_ids)) if parent_ids else {}
+        written: list[dict] = []
+        slot: dict[int, int] = {}
+        index: list[int] = []
+        for entry in entries:
+            parent_id = entry.get("parent_id")
+            if parent_id is None:
+                index.append(len(written))
+                written.append(entry)
+                continue
+            if parent_id in slot:
+                update = written[slot[parent_id]].get("update")
+                written[slot[parent_id]] = {**entry, "update": entry.get("update") or update}
+            else:
+                slot[parent_id] = len(written)
+                written.append({**entry, "update": entry.get("update") or known.get(parent_id)})
+            index.append(slot[parent_id])
+        return written, index
+
+    def _flush(self, entries: list[list | dict]) -> list[int | None]:
+        # Row number per entry; updates that no longer match are appended
+        entries, index = self._coalesce([entry if isinstance(entry, dict) else {"row": entry} for entry in entries])
+        row_numbers: list[int | None] = [None] * len(entries)
+        updates = [i for i, entry in enumerate(entries) if entry.get("update") is not None]
+        appends = [i for i, entry in enumerate(entries) if entry.get("update") is None]
+        if updates:
+            applied = self._update([(entries[i]["update"], entries[i]["row"]) for i in updates])
+            for i, ok in zip(updates, applied):
+                if ok:
+                    row_numbers[i] = entries[i]["update"]
+                else:
+                    appends.append(i)
+        if appends:
+            rows = [entries[i]["row"] for i in appends]
+            response = self._append([["" if cell is None else cell for cell in row] for row in rows])
+            first = _first_appended_row(response)
+            if first is not None:
+                for offset, i in enumerate(appends):
+                    row_numbers[i] = first + offset
+        self._record({
+            entry["parent_id"]: n for entry, n in zip(entries, row_numbers)
+            if entry.get("parent_id") is not None and n is not None
+        })
+        return [row_numbers[i] for i in index]
+
+    def close(self, timeout: float | None = None) -> None:
+        """
+        Flush everything still queued and stop the background thread.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_writer: SheetWriter | None = None
+_writer_lock = threading.Lock()
+
+def get_writer() -> SheetWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SheetWriter()
+        return _writer
+
+def enqueue_row(row: list[str], row_number: int | None = None, parent_id: int | None = None) -> Future:
+    """
+    Queues a row for the next batched flush to the configured Google Sheet,
+    overwriting row `row_number` if given, and records the paper's row in
+    the ledger once written.
+    """
+    return get_writer().enqueue(row, row_number, parent_id)
+
+def enqueue_rows(rows: list[list[str]], row_numbers: list[int | None] | None = None,
+                 parent_ids: list[int | None] | None = None) -> list[Future]:
+    return get_writer().enqueue_many(rows, row_numbers, parent_ids)
 
 # Step 5: Append a row
 def append_to_sheet(row: list[str]) -> None:
     """
     Appends a row to the configured Google Sheet.
     """
-    sheet = client.open_by_key(config.SPREADSHEET_ID).worksheet(config.SHEET_NAME)
-    sheet.append_row(row, value_input_option="USER_ENTERED")
+    append_rows_with_backoff([row])
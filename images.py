@@ -0,0 +1,114 @@
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+import metrics
+
+try:
+    from PIL import Image
+except ImportError:  # optional: without Pillow, images small enough are sent as Zotero rendered them
+    Image = None
+
+# Processed copies of Zotero's annotation images, named by content hash
+IMAGE_CACHE_DIR = getattr(config, "IMAGE_CACHE_DIR", "image_cache")
+IMAGE_MAX_SIDE = getattr(config, "IMAGE_MAX_SIDE", 1600)          # px, longest side
+IMAGE_MAX_BYTES = getattr(config, "IMAGE_MAX_BYTES", 1_000_000)   # per image, so 10 fit in one upload
+IMAGE_WORKERS = getattr(config, "IMAGE_WORKERS", 2)               # processes resizing images
+JPEG_QUALITIES = (85, 75, 60)   # tried in turn when a PNG is over budget
+MIN_SIDE = 200                  # stop shrinking below this
+
+
+def shrink(data: bytes, max_side: int = IMAGE_MAX_SIDE, max_bytes: int = IMAGE_MAX_BYTES) -> tuple[bytes, str] | None:
+    """
+    Resize an image to fit max_side and recompress it to at most max_bytes:
+    an optimised PNG if that fits, else JPEG at falling quality and size.
+    Returns (bytes, extension), or None if it can't be brought under budget.
+    Runs in a worker process.
+    """
+    if Image is None:
+        return (data, "png") if len(data) <= max_bytes else None
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.thumbnail((max_side, max_side))
+        out = io.BytesIO()
+        img.save(out, "PNG", optimize=True)
+        if out.tell() <= max_bytes:
+            return out.getvalue(), "png"
+
+        rgb = img.convert("RGB")
+    while True:
+        for quality in JPEG_QUALITIES:
+            out = io.BytesIO()
+            rgb.save(out, "JPEG", quality=quality, optimize=True)
+            if out.tell() <= max_bytes:
+                return out.getvalue(), "jpg"
+        if max(rgb.size) <= MIN_SIDE:
+            return None
+        rgb = rgb.resize((rgb.width * 3 // 4, rgb.height * 3 // 4))
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        return _pool
+
+
+def _digest(data: bytes) -> str:
+    # The budget is part of the key, so changing it re-processes images
+    return hashlib.sha256(data + f"|{IMAGE_MAX_SIDE}|{IMAGE_MAX_BYTES}".encode()).hexdigest()
+
+
+def _cached(digest: str) -> str | None:
+    for ext in ("png", "jpg"):
+        path = os.path.join(IMAGE_CACHE_DIR, f"{digest}.{ext}")
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def prepare_images(paths: list[str]) -> list[dict | None]:
+    """
+    Bring each image under the size budget, in parallel on a process pool.
+    Results are cached by content hash, so an image already processed is
+    never processed again. Returns {"path", "size"} of the processed copy
+    per input, or None for files that are missing or can't be shrunk enough.
+    Blocking.
+    """
+    results: list[dict | None] = [None] * len(paths)
+    misses = []
+    with metrics.stage("images"):
+        for i, path in enumerate(paths):
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            digest = _digest(data)
+            cached = _cached(digest)
+            if cached is not None:
+                results[i] = {"path": cached, "size": os.path.getsize(cached)}
+            else:
+                misses.append((i, digest, get_pool().submit(shrink, data)))
+
+        if misses:
+            os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+        for i, digest, future in misses:
+            shrunk = future.result()
+            if shrunk is None:
+                continue
+            data, ext = shrunk
+            out = os.path.join(IMAGE_CACHE_DIR, f"{digest}.{ext}")
+            tmp = out + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, out)
+            results[i] = {"path": out, "size": len(data)}
+    return results
@@ -0,0 +1,93 @@
+import json
+import sqlite3
+import threading
+import time
+
+# Record of what has already been published where (never zotero.sqlite)
+LEDGER_PATH = "ledger.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS delivered (
+    channel_id    INTEGER NOT NULL,
+    annotation_id INTEGER NOT NULL,
+    delivered_at  REAL NOT NULL,
+    PRIMARY KEY (channel_id, annotation_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS sheet_rows (
+    sheet      TEXT NOT NULL,
+    parent_id  INTEGER NOT NULL,
+    row_number INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (sheet, parent_id)
+) WITHOUT ROWID;
+"""
+
+
+class PublishLedger:
+    """
+    Which highlights went to which Discord channel, and which sheet row
+    belongs to which paper, so repeated \\pull / \\push only send what's new
+    and update rows in place instead of appending duplicates.
+    """
+
+    def __init__(self, path: str = LEDGER_PATH):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def delivered(self, channel_id: int, annotation_ids: list[int]) -> set[int]:
+        """
+        The subset of annotation_ids already delivered to channel_id.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT annotation_id FROM delivered"
+                " WHERE channel_id = ? AND annotation_id IN (SELECT value FROM json_each(?))",
+                (channel_id, json.dumps(list(annotation_ids))),
+            )
+            return {row[0] for row in rows}
+
+    def mark_delivered(self, channel_id: int, annotation_ids: list[int]) -> None:
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO delivered (channel_id, annotation_id, delivered_at) VALUES (?, ?, ?)",
+                [(channel_id, aid, now) for aid in annotation_ids],
+            )
+
+    def sheet_rows(self, sheet: str, parent_ids: list[int]) -> dict[int, int]:
+        """
+        parent itemID -> sheet row number for papers already in the sheet.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT parent_id, row_number FROM sheet_rows"
+                " WHERE sheet = ? AND parent_id IN (SELECT value FROM json_each(?))",
+                (sheet, json.dumps(list(parent_ids))),
+            )
+            return dict(rows.fetchall())
+
+    def set_sheet_rows(self, sheet: str, rows: dict[int, int]) -> None:
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO sheet_rows (sheet, parent_id, row_number, updated_at) VALUES (?, ?, ?, ?)",
+                [(sheet, pid, row_number, now) for pid, row_number in rows.items()],
+            )
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+_ledger: PublishLedger | None = None
+_ledger_lock = threading.Lock()
+
+def get_ledger() -> PublishLedger:
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = PublishLedger()
+        return _ledger
@@ -1,6 +1,7 @@
 # local_sql_reader.py
 
 import sqlite3
+from colors import hex_to_name
 
 # Replace korbe nijer Zotero profile folder name & username
 ZOT_DB_PATH = r"C:\Users\sakha\AppData\Roaming\Zotero\Zotero\Profiles\abc12345.default\zotero.sqlite"
@@ -36,31 +37,6 @@ def get_annotations_by_itemID(item_id):
         })
     return annotations
 
-def hex_to_name(hex_color):
-    if not hex_color or not hex_color.startswith("#"):
-        return None
-    c = hex_color.lower().lstrip("#")
-    if len(c) == 3:
-        c = "".join([ch*2 for ch in c])
-    try:
-        r = int(c[0:2], 16)
-        g = int(c[2:4], 16)
-        b = int(c[4:6], 16)
-    except:
-        return None
-    if r > 240 and g > 240 and b < 100:
-        return 'yellow'
-    elif g > 200 and r < 100 and b < 100:
-        return 'green'
-    elif b > 200 and r < 100 and g < 100:
-        return 'blue'
-    elif r > 200 and g < 100 and b < 100:
-        return 'red'
-    elif r > 100 and b > 100 and g < 100:
-        return 'purple'
-    else:
-        return None
-
 if __name__ == "__main__":
     ikey = input("Enter Zotero itemKey (e.g. RFCM2DHI): ").strip()
     iid = get_item_id_from_key(ikey)
@@ -0,0 +1,271 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the command/stage latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_COMMANDS = 200  # durations kept per command for \stats percentiles
+
+PREFIX = "zotecord"
+
+
+class Trace:
+    """
+    What one command spent its time on: seconds per stage, SQL statements
+    run and Discord 429s/retries hit. Carried in a context variable, so code
+    running on the command's behalf (including executor threads started via
+    async_io) adds to the right trace without it being passed around.
+    """
+
+    def __init__(self, command: str):
+        self.command = command
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.stages: dict[str, float] = {}
+        self.calls: dict[str, int] = {}
+        self.queries = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def summary(self) -> str:
+        parts = [f"{stage} {seconds * 1000:.0f} ms ×{self.calls[stage]}" for stage, seconds in self.stages.items()]
+        parts.append(f"{self.queries} queries")
+        if self.rate_limited or self.retries:
+            parts.append(f"{self.rate_limited}×429, {self.retries} retries")
+        return f"{self.command} took {self.duration * 1000:.0f} ms: " + ", ".join(parts)
+
+
+_current: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("trace", default=None)
+
+
+def current_trace() -> Trace | None:
+    return _current.get()
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Metrics:
+    """
+    Process-wide counters and latency histograms, rendered in Prometheus
+    text format by render() and summarised for \\stats by snapshot().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: dict[tuple[str, tuple], float] = {}
+        self.histograms: dict[tuple[str, tuple], Histogram] = {}
+        self.gauges: dict[tuple[str, tuple], float] = {}
+        self.recent: dict[str, deque] = {}
+        self.started = time.time()
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = value
+
+    def gauge(self, name: str, **labels) -> float | None:
+        with self._lock:
+            return self.gauges.get((name, tuple(sorted(labels.items()))))
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(seconds)
+
+    def finish(self, trace: Trace) -> None:
+        self.inc("commands_total", command=trace.command)
+        self.observe("command_seconds", trace.duration, command=trace.command)
+        self.inc("command_queries_total", trace.queries, command=trace.command)
+        with self._lock:
+            self.recent.setdefault(trace.command, deque(maxlen=RECENT_COMMANDS)).append(trace.duration)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            if labels:
+                return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+            return sum(v for (n, _), v in self.counters.items() if n == name)
+
+    def render(self) -> str:
+        def fmt(labels: tuple, extra: tuple = ()) -> str:
+            pairs = [f'{k}="{v}"' for k, v in labels + extra]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        lines = []
+        with self._lock:
+            for name in sorted({n for n, _ in self.counters}):
+                lines.append(f"# TYPE {PREFIX}_{name} counter")
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{PREFIX}_{name}{fmt(labels)} {value:g}")
+            for name in sorted({n for n, _ in self.gauges}):
+                lines.append(f"# TYPE {PREFIX}_{name} gauge")
+                for (n, labels), value in sorted(self.gauges.items()):
+                    if n == name:
+                        lines.append(f"{PREFIX}_{name}{fmt(labels)} {value:g}")
+            for name in sorted({n for n, _ in self.histograms}):
+                lines.append(f"# TYPE {PREFIX}_{name} histogram")
+                for (n, labels), hist in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), hist.counts):
+                        cumulative += count
+                        lines.append(f"{PREFIX}_{name}_bucket{fmt(labels, (('le', bound),))} {cumulative}")
+                    lines.append(f"{PREFIX}_{name}_sum{fmt(labels)} {hist.total:.6f}")
+                    lines.append(f"{PREFIX}_{name}_count{fmt(labels)} {hist.count}")
+        lines.append(f"# TYPE {PREFIX}_uptime_seconds gauge")
+        lines.append(f"{PREFIX}_uptime_seconds {time.time() - self.started:.0f}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """
+        Per-command count, p50/p99 of recent runs and average stage times.
+        """
+        with self._lock:
+            commands = {}
+            for command, durations in self.recent.items():
+                ordered = sorted(durations)
+                commands[command] = {
+                    "count": self.counters.get(("commands_total", (("command", command),)), 0),
+                    "p50": ordered[len(ordered) // 2],
+                    "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+                    "queries": self.counters.get(("command_queries_total", (("command", command),)), 0),
+                }
+            stages = {}
+            for (name, labels), hist in self.histograms.items():
+                if name == "stage_seconds":
+                    stages[dict(labels)["stage"]] = {"count": hist.count, "avg": hist.total / (hist.count or 1)}
+        return {"commands": commands, "stages": stages}
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def trace(command: str):
+    """
+    Trace everything run on behalf of `command` until the block exits.
+    """
+    t = Trace(command)
+    token = _current.set(t)
+    try:
+        yield t
+    finally:
+        _current.reset(token)
+        t.duration = time.perf_counter() - t.started
+        metrics.finish(t)
+
+
+@contextmanager
+def activate(t: Trace | None):
+    """
+    Attribute work to an existing trace (e.g. from a task that outlives the
+    command that queued the work) without finishing it on exit.
+    """
+    token = _current.set(t)
+    try:
+        yield t
+    finally:
+        _current.reset(token)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """
+    Add time spent in a stage ("db", "sheets", "discord", ...) to the
+    global histogram and to the current command's trace, if any.
+    """
+    metrics.observe("stage_seconds", seconds, stage=stage)
+    t = _current.get()
+    if t is not None:
+        t.add_stage(stage, seconds)
+
+
+@contextmanager
+def stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def count_query(statement: str) -> None:
+    """
+    sqlite3 trace callback: counts every statement a reader connection runs.
+    """
+    metrics.inc("sqlite_queries_total")
+    t = _current.get()
+    if t is not None:
+        t.queries += 1
+
+
+def count_retry(service: str, rate_limited: bool = True) -> None:
+    """
+    Count a retried request to Discord or Sheets, and whether it was a 429.
+    """
+    metrics.inc("retries_total", service=service)
+    if rate_limited:
+        metrics.inc("rate_limited_total", service=service)
+    t = _current.get()
+    if t is not None:
+        t.retries += 1
+        t.rate_limited += rate_limited
+
+
+# ── Prometheus endpoint ──
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve /metrics on a daemon thread; binds to localhost unless told otherwise.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,91 @@
+import json
+
+# Rects are PDF points: (x1, y1, x2, y2) with y growing upwards
+ADJACENT_GAP = 4.0      # horizontal gap (pt) on the same line that still counts as touching
+LINE_OVERLAP = 0.5      # share of the shorter rect's height two rects must share to be on one line
+ADJACENT_CHARS = 2      # text gap (chars) between highlights that still counts as touching
+MIN_TEXT_OVERLAP = 3    # shortest shared suffix/prefix spliced when joining texts
+
+
+def _geometry(ann: dict) -> tuple[int | None, list[tuple[float, float, float, float]]]:
+    try:
+        position = json.loads(ann.get("position") or "{}")
+    except ValueError:
+        return None, []
+    rects = [tuple(r) for r in position.get("rects") or [] if len(r) == 4]
+    return position.get("pageIndex"), rects
+
+
+def _offset(ann: dict) -> int | None:
+    # sortIndex is "page|character offset|top"; the offset is in the page's text
+    parts = (ann.get("sortIndex") or "").split("|")
+    return int(parts[1]) if len(parts) == 3 and parts[1].isdigit() else None
+
+
+def _rects_touch(a: tuple, b: tuple) -> bool:
+    shared = min(a[3], b[3]) - max(a[1], b[1])
+    if shared < LINE_OVERLAP * min(a[3] - a[1], b[3] - b[1]):
+        return False
+    return a[0] <= b[2] + ADJACENT_GAP and b[0] <= a[2] + ADJACENT_GAP
+
+
+def _join(a: str, b: str) -> str:
+    # Splice b onto a without repeating the part they share
+    if b in a:
+        return a
+    if a in b:
+        return b
+    for k in range(min(len(a), len(b)) - 1, MIN_TEXT_OVERLAP - 1, -1):
+        if a.endswith(b[:k]):
+            return a + b[k:]
+    return f"{a} {b}"
+
+
+class _Cluster:
+    def __init__(self, ann: dict, rects: list, offset: int | None):
+        self.ann = dict(ann)
+        self.rects = list(rects)
+        self.start = offset
+        self.end = offset + len(ann["text"]) if offset is not None else None
+
+    def touches(self, rects: list, offset: int | None) -> bool:
+        if offset is not None and self.end is not None and self.start <= offset <= self.end + ADJACENT_CHARS:
+            return True
+        return any(_rects_touch(a, b) for a in self.rects for b in rects)
+
+    def absorb(self, ann: dict, rects: list, offset: int | None) -> None:
+        self.ann["text"] = _join(self.ann["text"], ann["text"])
+        self.ann.setdefault("mergedIDs", []).append(ann["itemID"])
+        self.rects.extend(rects)
+        if offset is not None and self.end is not None:
+            self.end = max(self.end, offset + len(ann["text"]))
+
+
+def merge_overlapping(annotations: list[dict]) -> list[dict]:
+    """
+    Merge highlights of the same colour on the same page that overlap or
+    touch (the same passage highlighted twice, or in pieces) into one,
+    with the other highlights' itemIDs in "mergedIDs".
+
+    Expects reading order (sortIndex) as the reader returns it; that order
+    already follows columns, which sorting by rect position would not. Each
+    highlight is only compared with the latest merged highlight of its
+    page and colour, so this is one linear pass. Highlights without
+    position data are passed through.
+    """
+    merged: list[_Cluster] = []
+    open_clusters: dict[tuple, _Cluster] = {}
+    for ann in annotations:
+        page, rects = _geometry(ann)
+        offset = _offset(ann)
+        if page is None:
+            merged.append(_Cluster(ann, rects, offset))
+            continue
+        key = (ann.get("attachmentID"), page, ann["color"])
+        cluster = open_clusters.get(key)
+        if cluster is not None and cluster.touches(rects, offset):
+            cluster.absorb(ann, rects, offset)
+        else:
+            cluster = open_clusters[key] = _Cluster(ann, rects, offset)
+            merged.append(cluster)
+    return [cluster.ann for cluster in merged]
@@ -0,0 +1,133 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Rendered output per item key (Discord message chunks, Sheets row data),
+# kept apart from zotero.sqlite and from cache.json (sync state)
+RENDER_CACHE_PATH = "render_cache.sqlite"
+MEMORY_ENTRIES = 256      # rendered items kept in memory
+DISK_ENTRIES = 5000       # rows kept on disk; least recently used go first
+PRUNE_EVERY = 100         # puts between disk prunes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rendered (
+    item_key    TEXT NOT NULL,
+    variant     TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    payload     TEXT NOT NULL,
+    used_at     REAL NOT NULL,
+    PRIMARY KEY (item_key, variant)
+);
+CREATE INDEX IF NOT EXISTS rendered_used_at ON rendered(used_at);
+"""
+
+
+class RenderCache:
+    """
+    LRU of rendered output keyed by (item key, variant), valid only while
+    the item's fingerprint (see ZoteroReader.key_fingerprint) is unchanged.
+
+    `variant` names what was rendered and how ("pull/text/…", "full"), so
+    one paper can have several renderings cached at once. Entries are
+    written through to a small SQLite file, so a restart starts warm.
+    """
+
+    def __init__(self, path: str | None = RENDER_CACHE_PATH, memory_entries: int = MEMORY_ENTRIES,
+                 disk_entries: int = DISK_ENTRIES):
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory: OrderedDict[tuple[str, str], tuple[str, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            self.conn.executescript(SCHEMA)
+
+    def _remember(self, key: tuple[str, str], fingerprint: str, payload) -> None:
+        self._memory[key] = (fingerprint, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, item_key: str, variant: str, fingerprint: str | None):
+        """
+        The cached payload if it was rendered from this fingerprint, else None.
+        """
+        if fingerprint is None:
+            return None
+        key = (item_key, variant)
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            if self.conn is not None:
+                row = self.conn.execute(
+                    "SELECT payload FROM rendered WHERE item_key = ? AND variant = ? AND fingerprint = ?",
+                    (item_key, variant, fingerprint),
+                ).fetchone()
+                if row:
+                    payload = json.loads(row[0])
+                    self._remember(key, fingerprint, payload)
+                    with self.conn:
+                        self.conn.execute(
+                            "UPDATE rendered SET used_at = ? WHERE item_key = ? AND variant = ?",
+                            (time.time(), item_key, variant),
+                        )
+                    self.hits += 1
+                    return payload
+            self.misses += 1
+            return None
+
+    def put(self, item_key: str, variant: str, fingerprint: str | None, payload) -> None:
+        """
+        Cache a JSON-serialisable payload rendered from `fingerprint`.
+        """
+        if fingerprint is None:
+            return
+        with self._lock:
+            self._remember((item_key, variant), fingerprint, payload)
+            if self.conn is None:
+                return
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO rendered (item_key, variant, fingerprint, payload, used_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (item_key, variant, fingerprint, json.dumps(payload, ensure_ascii=False), time.time()),
+                )
+                self._puts += 1
+                if self._puts % PRUNE_EVERY == 0:
+                    self.conn.execute(
+                        "DELETE FROM rendered WHERE rowid IN ("
+                        " SELECT rowid FROM rendered ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                        (self.disk_entries,),
+                    )
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+
+
+_cache: RenderCache | None = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> RenderCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = RenderCache()
+        return _cache
+
+def get_rendered(item_key: str, variant: str, fingerprint: str | None):
+    return get_cache().get(item_key, variant, fingerprint)
+
+def put_rendered(item_key: str, variant: str, fingerprint: str | None, payload) -> None:
+    get_cache().put(item_key, variant, fingerprint, payload)
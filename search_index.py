@@ -0,0 +1,165 @@
+import re
+import sqlite3
+import threading
+import time
+
+import zotero_reader
+from sync_state import SyncState
+
+# Local full-text index over highlights (never written into zotero.sqlite)
+SEARCH_INDEX_PATH = "search_index.sqlite"
+REFRESH_INTERVAL = 10.0   # seconds between incremental index updates
+INDEX_CHUNK = 500         # papers re-indexed per bulk read
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS highlights USING fts5(
+    text, comment, title, authors,
+    color UNINDEXED, year UNINDEXED, item_key UNINDEXED,
+    annotation_id UNINDEXED, paper_id UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
+
+SQL_SEARCH = """
+    SELECT item_key, title, year, color,
+           snippet(highlights, -1, '**', '**', '…', 16), bm25(highlights)
+    FROM highlights
+    WHERE highlights MATCH ?
+      AND (? IS NULL OR color = ?)
+      AND (? IS NULL OR year = ?)
+    ORDER BY bm25(highlights)
+    LIMIT ?
+"""
+
+# "\search color:red" has no terms to MATCH: list the filtered highlights
+SQL_FILTER = """
+    SELECT item_key, title, year, color, text, NULL
+    FROM highlights
+    WHERE (? IS NULL OR color = ?)
+      AND (? IS NULL OR year = ?)
+    ORDER BY year DESC, title, rowid
+    LIMIT ?
+"""
+SNIPPET_WORDS = 16
+
+
+def _year(date: str | None) -> str:
+    match = re.search(r"\d{4}", date or "")
+    return match.group(0) if match else ""
+
+
+def _preview(text: str) -> str:
+    words = text.split()
+    return " ".join(words[:SNIPPET_WORDS]) + ("…" if len(words) > SNIPPET_WORDS else "")
+
+
+def parse_query(raw: str) -> tuple[str, str | None, str | None]:
+    """
+    Split "sample size color:red year:2023" into (fts query, color, year).
+    Free-text terms are quoted so user input can't break FTS5 syntax.
+    """
+    color = year = None
+    terms = []
+    for token in raw.split():
+        lowered = token.lower()
+        if lowered.startswith("color:"):
+            color = lowered[len("color:"):] or None
+        elif lowered.startswith("year:"):
+            year = lowered[len("year:"):] or None
+        else:
+            terms.append('"' + token.replace('"', '""') + '"')
+    return " ".join(terms), color, year
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index of highlight text and comments plus the paper's
+    title, authors and year, kept in its own file.
+
+    update() re-indexes only papers whose fingerprint changed since the
+    last update (see SyncState), so keeping it fresh costs time
+    proportional to edits.
+    """
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH, reader: zotero_reader.ZoteroReader | None = None):
+        self.path = path
+        self.reader = reader
+        self.state = SyncState(path + ".state.json", reader)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._updated_at = 0.0
+
+    def _reader(self) -> zotero_reader.ZoteroReader:
+        return self.reader or zotero_reader.get_reader()
+
+    def update(self) -> int:
+        """
+        Re-index changed papers; returns how many were re-indexed.
+        """
+        with self._lock:
+            reader = self._reader()
+            changed = self.state.changed_since()
+            for start in range(0, len(changed), INDEX_CHUNK):
+                chunk = changed[start:start + INDEX_CHUNK]
+                metadata = reader.load_metadata(chunk)
+                highlights = reader.paper_highlights(chunk)
+                rows = [
+                    (h["text"], h["comment"] or "", metadata[pid]["title"] or "", metadata[pid]["authors"],
+                     h["color"] or "", _year(metadata[pid]["year"]), h["attachmentKey"], h["itemID"], pid)
+                    for pid in chunk
+                    for h in highlights[pid]
+                ]
+                with self.conn:
+                    self.conn.executemany(
+                        "DELETE FROM highlights WHERE paper_id = ?", [(pid,) for pid in chunk]
+                    )
+                    self.conn.executemany(
+                        "INSERT INTO highlights (text, comment, title, authors, color, year, item_key,"
+                        " annotation_id, paper_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            self.state.commit()
+            self._updated_at = time.monotonic()
+            return len(changed)
+
+    def search(self, raw_query: str, limit: int = 10) -> list[dict]:
+        """
+        Ranked matches for "<terms> [color:red] [year:2023]", refreshing the
+        index first if it hasn't been updated for REFRESH_INTERVAL seconds.
+        With only filters, the matching highlights are listed unranked.
+        """
+        if time.monotonic() - self._updated_at >= REFRESH_INTERVAL:
+            self.update()
+        query, color, year = parse_query(raw_query)
+        if not query and color is None and year is None:
+            return []
+        with self._lock:
+            if query:
+                rows = self.conn.execute(SQL_SEARCH, (query, color, color, year, year, limit)).fetchall()
+            else:
+                rows = [
+                    row[:4] + (_preview(row[4]),) + row[5:]
+                    for row in self.conn.execute(SQL_FILTER, (color, color, year, year, limit))
+                ]
+        return [
+            {"key": key, "title": title, "year": yr, "color": col, "snippet": snip, "rank": rank}
+            for key, title, yr, col, snip, rank in rows
+        ]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+_index: SearchIndex | None = None
+_index_lock = threading.Lock()
+
+def get_index() -> SearchIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex()
+        return _index
+
+def search_highlights(raw_query: str, limit: int = 10) -> list[dict]:
+    return get_index().search(raw_query, limit)
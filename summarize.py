@@ -0,0 +1,209 @@
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import config
+import metrics
+from zotero_reader import format_bullets
+
+# Condenses long highlight cells with an LLM through OpenRouter (optional)
+OPENROUTER_API_KEY = getattr(config, "OPENROUTER_API_KEY", "")
+OPENROUTER_BASE_URL = getattr(config, "OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+SUMMARY_MODEL = getattr(config, "SUMMARY_MODEL", "openai/gpt-4o-mini")
+SUMMARY_MIN_BULLETS = getattr(config, "SUMMARY_MIN_BULLETS", 8)      # shorter cells are kept as they are
+SUMMARY_MAX_BULLETS = getattr(config, "SUMMARY_MAX_BULLETS", 6)      # per summarised cell
+SUMMARY_CACHE_PATH = getattr(config, "SUMMARY_CACHE_PATH", "summary_cache.sqlite")
+SUMMARY_TIMEOUT = 120.0     # seconds per request
+PROMPT_VERSION = 1          # bump when the prompt changes, so cached summaries are redone
+MAX_RETRIES = 4
+
+# Sheet column -> section name the model sees (see zotero_reader.add_highlight_columns)
+SECTIONS = {
+    "methodology": "methods",
+    "contributions": "contribution",
+    "result": "results",
+    "claims": "claims",
+    "limitations": "limitations",
+}
+
+SYSTEM_PROMPT = (
+    "You condense highlights taken from one research paper into short notes for a spreadsheet. "
+    "For each section you are given, write at most {max_bullets} bullet points that keep the specific "
+    "methods, datasets, numbers and terms of the highlights; don't add anything they don't say. "
+    'Reply with only a JSON object mapping each section name to a list of strings, e.g. {{"results": ["..."]}}.'
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    digest     TEXT PRIMARY KEY,
+    summary    TEXT NOT NULL,
+    created_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SummaryError(Exception):
+    pass
+
+
+def post_json(url: str, payload: dict, headers: dict[str, str], timeout: float = SUMMARY_TIMEOUT) -> dict:
+    """
+    POST a JSON body and return the decoded JSON response (the default
+    transport; pass another as Summarizer(post=...), e.g. for tests).
+    Raises urllib.error.HTTPError for non-2xx responses.
+    """
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), method="POST",
+        headers={"Content-Type": "application/json", **headers},
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def _bullet_count(cell: str | None) -> int:
+    return len([part for part in (cell or "").split("\n\n") if part.strip()])
+
+
+def _parse_reply(content: str) -> dict:
+    # Models sometimes wrap JSON in a ```json fence despite being asked not to
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[-1].rsplit("```", 1)[0]
+    try:
+        reply = json.loads(content)
+    except ValueError:
+        raise SummaryError("the model's reply was not JSON")
+    if not isinstance(reply, dict):
+        raise SummaryError("the model's reply was not a JSON object")
+    return reply
+
+
+class Summarizer:
+    """
+    Replaces highlight cells with SUMMARY_MIN_BULLETS or more bullets by a
+    summary. All of a paper's long cells go to the model in one request,
+    and every summary is cached on disk by a hash of the cell text (plus
+    model and prompt), so a cell that hasn't changed is never sent again.
+    Thread-safe: several papers can be summarised at once.
+    """
+
+    def __init__(self, api_key: str = OPENROUTER_API_KEY, base_url: str = OPENROUTER_BASE_URL,
+                 model: str = SUMMARY_MODEL, cache_path: str = SUMMARY_CACHE_PATH, post=post_json):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self._post = post
+        self.conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _digest(self, section: str, text: str) -> str:
+        key = [self.model, PROMPT_VERSION, SUMMARY_MAX_BULLETS, section, text]
+        return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+    def _cached(self, digests: list[str]) -> dict[str, str]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT digest, summary FROM summaries WHERE digest IN (SELECT value FROM json_each(?))",
+                (json.dumps(digests),),
+            )
+            return dict(rows.fetchall())
+
+    def _store(self, summaries: dict[str, str]) -> None:
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO summaries (digest, summary, created_at) VALUES (?, ?, ?)",
+                [(digest, summary, now) for digest, summary in summaries.items()],
+            )
+
+    def _request(self, sections: dict[str, str]) -> dict:
+        payload = {
+            "model": self.model,
+            "temperature": 0.2,
+            "response_format": {"type": "json_object"},
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT.format(max_bullets=SUMMARY_MAX_BULLETS)},
+                {"role": "user", "content": json.dumps(sections, ensure_ascii=False)},
+            ],
+        }
+        headers = {"Authorization": f"Bearer {self.api_key}", "X-Title": "Zotero highlights"}
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                metrics.metrics.inc("openrouter_requests_total")
+                with metrics.stage("summarize"):
+                    response = self._post(f"{self.base_url}/chat/completions", payload, headers)
+                break
+            except urllib.error.HTTPError as e:
+                retryable = e.code == 429 or e.code >= 500
+                if attempt == MAX_RETRIES or not retryable:
+                    raise SummaryError(f"OpenRouter returned HTTP {e.code}") from e
+                metrics.count_retry("openrouter", rate_limited=e.code == 429)
+            except (urllib.error.URLError, TimeoutError) as e:
+                if attempt == MAX_RETRIES:
+                    raise SummaryError(f"OpenRouter unreachable ({e})") from e
+                metrics.count_retry("openrouter", rate_limited=False)
+            time.sleep(min(2 ** attempt, 30) + random.random())
+        try:
+            content = response["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise SummaryError(f"unexpected OpenRouter response: {str(response)[:200]}")
+        return _parse_reply(content or "")
+
+    def summarize(self, metadata: dict) -> dict:
+        """
+        A copy of a paper's metadata (get_full_metadata) with its long
+        highlight cells summarised. Cells the model leaves out are kept as
+        they are. Blocking; raises SummaryError if the request fails.
+        """
+        long_cells = {
+            column: metadata[column] for column in SECTIONS
+            if _bullet_count(metadata.get(column)) >= SUMMARY_MIN_BULLETS
+        }
+        if not long_cells:
+            return metadata
+        digests = {column: self._digest(SECTIONS[column], text) for column, text in long_cells.items()}
+        cached = self._cached(list(digests.values()))
+        missing = {SECTIONS[column]: text for column, text in long_cells.items() if digests[column] not in cached}
+        metrics.metrics.inc("summary_cache_hits_total", len(long_cells) - len(missing))
+
+        if missing:
+            reply = self._request(missing)
+            fresh = {}
+            for column, text in long_cells.items():
+                bullets = reply.get(SECTIONS[column]) if SECTIONS[column] in missing else None
+                if isinstance(bullets, str):
+                    bullets = [bullets]
+                if isinstance(bullets, list) and bullets and all(isinstance(b, str) for b in bullets):
+                    fresh[digests[column]] = format_bullets([b.strip() for b in bullets])
+            self._store(fresh)
+            cached.update(fresh)
+
+        summarized = dict(metadata)
+        for column in long_cells:
+            if digests[column] in cached:
+                summarized[column] = cached[digests[column]]
+        return summarized
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+_summarizer: Summarizer | None = None
+_summarizer_lock = threading.Lock()
+
+def get_summarizer() -> Summarizer:
+    global _summarizer
+    with _summarizer_lock:
+        if _summarizer is None:
+            _summarizer = Summarizer()
+        return _summarizer
+
+def summarize_metadata(metadata: dict) -> dict:
+    return get_summarizer().summarize(metadata)
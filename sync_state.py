@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+
+import zotero_reader
+
+# Where the sync high-water marks and fingerprints are kept
+SYNC_STATE_PATH = "cache.json"
+
+
+class SyncState:
+    """
+    Remembers what was already processed, so periodic re-syncs only look at
+    papers edited since the last run.
+
+    Stores, per library, the high-water mark of items.clientDateModified /
+    items.version and the count / id-sum of its highlights, and per paper
+    a fingerprint of its metadata and annotation set. Deleted highlights
+    leave no modified item behind; when the library totals don't add up
+    with the edited papers, every known paper is fingerprinted again.
+    Typical use:
+
+        changed = state.changed_since()
+        ... process changed papers ...
+        state.commit()
+    """
+
+    def __init__(self, path: str = SYNC_STATE_PATH, reader: zotero_reader.ZoteroReader | None = None):
+        self.path = path
+        self.reader = reader
+        self._lock = threading.Lock()
+        self._libraries: dict[str, dict] = {}
+        self._fingerprints: dict[str, str] = {}
+        self._staged: tuple[dict, dict] | None = None
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            raw = f.read().strip()
+        if not raw:
+            return
+        data = json.loads(raw)
+        self._libraries = data.get("libraries", {})
+        self._fingerprints = data.get("fingerprints", {})
+
+    def _save(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"libraries": self._libraries, "fingerprints": self._fingerprints}, f)
+        os.replace(tmp, self.path)
+
+    def _reader(self) -> zotero_reader.ZoteroReader:
+        return self.reader or zotero_reader.get_reader()
+
+    def _highlights(self, fingerprint: str | None) -> tuple[int, int]:
+        # Fingerprints are "modified|count|id_sum|latest annotation edit"
+        if not fingerprint:
+            return 0, 0
+        _, count, id_sum, _ = fingerprint.split("|")
+        return int(count), int(id_sum)
+
+    def changed_since(self) -> list[int]:
+        """
+        Return the paper itemIDs whose metadata or annotations changed since
+        the last commit(). Nothing is persisted until commit() is called.
+        """
+        reader = self._reader()
+        with self._lock:
+            marks = reader.library_marks()
+            totals = reader.highlight_totals()
+            checked: dict[int, None] = {}  # insertion-ordered set
+            current: dict[int, str] = {}
+            rescan = False
+            for library_id in marks:
+                last = self._libraries.get(str(library_id), {})
+                candidates = reader.modified_parent_ids(
+                    library_id, last.get("clientDateModified", ""), last.get("version", -1)
+                )
+                fingerprints = reader.fingerprints(candidates)
+                checked.update(dict.fromkeys(candidates))
+                current.update(fingerprints)
+
+                # Highlights the edited papers gained or lost should account
+                # for every change in the library totals; if not, some other
+                # paper had highlights deleted
+                if "highlights" in last:
+                    count, id_sum = last["highlights"]
+                    for pid in candidates:
+                        old = self._highlights(self._fingerprints.get(str(pid)))
+                        new = self._highlights(fingerprints.get(pid))
+                        count, id_sum = count + new[0] - old[0], id_sum + new[1] - old[1]
+                    rescan = rescan or (count, id_sum) != totals.get(library_id, (0, 0))
+
+            if rescan:
+                others = [int(pid) for pid in self._fingerprints if int(pid) not in checked]
+                checked.update(dict.fromkeys(others))
+                current.update(reader.fingerprints(others))
+
+            changed: list[int] = []
+            new_fingerprints: dict[str, str | None] = {}
+            for pid in checked:
+                fp = current.get(pid)  # None: the paper itself was deleted
+                if self._fingerprints.get(str(pid)) != fp:
+                    changed.append(pid)
+                    new_fingerprints[str(pid)] = fp
+
+            new_libraries = {
+                str(lib): {"clientDateModified": modified, "version": version,
+                           "highlights": list(totals.get(lib, (0, 0)))}
+                for lib, (modified, version) in marks.items()
+            }
+            self._staged = (new_libraries, new_fingerprints)
+            return changed
+
+    def commit(self) -> None:
+        """
+        Persist the marks and fingerprints seen by the last changed_since().
+        """
+        with self._lock:
+            if self._staged is None:
+                return
+            new_libraries, new_fingerprints = self._staged
+            self._libraries.update(new_libraries)
+            for pid, fp in new_fingerprints.items():
+                if fp is None:
+                    self._fingerprints.pop(pid, None)
+                else:
+                    self._fingerprints[pid] = fp
+            self._staged = None
+            self._save()
+
+    def reset(self) -> None:
+        """
+        Forget everything, so the next changed_since() returns the whole library.
+        """
+        with self._lock:
+            self._libraries, self._fingerprints, self._staged = {}, {}, None
+            self._save()
@@ -0,0 +1,229 @@
+# synthetic_db.py
+#
+# Build a synthetic zotero.sqlite from the real Zotero DDL in schema.txt,
+# for benchmarking the reader at library sizes nobody wants to annotate by
+# hand. Every paper gets a PDF attachment with N highlights, 1–4 authors,
+# the metadata fields the bot reads, and some collection/tag membership.
+#
+#   python synthetic_db.py bench_data/zotero_50k.sqlite --items 50000 --highlights 20
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.txt")
+
+# Zotero's own key alphabet (no 0, 1, O or I)
+KEY_CHARS = "23456789ABCDEFGHIJKLMNPQRSTUVWXYZ"
+
+ITEM_TYPES = {"annotation": 1, "attachment": 3, "journalArticle": 22}
+FIELDS = {"title": 1, "abstractNote": 2, "date": 6, "url": 13, "publicationTitle": 12, "DOI": 26}
+CREATOR_TYPE_AUTHOR = 1
+
+# (colour, weight): mostly the five bucket colours, plus some ignored ones
+COLORS = [
+    ("#ffd400", 30), ("#5fb236", 15), ("#2ea8e5", 15), ("#a28ae5", 10), ("#ff6666", 10),
+    ("#f19837", 5), ("#aaaaaa", 5), ("#e56eee", 3), ("#ffd500", 4), ("#ff6767", 3),
+]
+VENUES = ["Nature", "Science", "NeurIPS", "ICML", "ACL", "CHI", "PLOS ONE", "JAMA", "Cell", "arXiv"]
+COLLECTIONS = ["Reading List", "Thesis", "Methods", "To Review"]
+TAGS = ["ml", "stats", "survey", "replication", "theory", "dataset"]
+WORDS = (
+    "model data sample effect method result analysis study variance bias estimate network "
+    "training error baseline robust signal treatment control cohort measure causal latent "
+    "significant observed proposed approach evidence limitation future benchmark performance"
+).split()
+
+BATCH = 20000  # rows per executemany
+
+
+def item_key(item_id: int) -> str:
+    """
+    Deterministic, unique 8-character key in Zotero's alphabet.
+    """
+    chars = []
+    n = item_id
+    for _ in range(8):
+        n, r = divmod(n, len(KEY_CHARS))
+        chars.append(KEY_CHARS[r])
+    return "".join(reversed(chars))
+
+
+def _sentence(rng: random.Random, min_words: int, max_words: int) -> str:
+    words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+    return " ".join(words).capitalize() + "."
+
+
+class _Rows:
+    """
+    Buffers rows per INSERT statement and flushes them in batches.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.pending: dict[str, list[tuple]] = {}
+
+    def add(self, sql: str, row: tuple) -> None:
+        rows = self.pending.setdefault(sql, [])
+        rows.append(row)
+        if len(rows) >= BATCH:
+            self.conn.executemany(sql, rows)
+            rows.clear()
+
+    def flush(self) -> None:
+        for sql, rows in self.pending.items():
+            if rows:
+                self.conn.executemany(sql, rows)
+                rows.clear()
+
+
+def build(path: str, items: int, highlights: int, seed: int = 0, long_every: int = 50) -> dict:
+    """
+    Write a synthetic library of `items` papers with `highlights` highlights
+    each to `path` (replacing it). Every `long_every`-th highlight is long
+    enough to need splitting across Discord messages. Returns a summary.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -524288")  # 512 MiB, so index pages stay in memory at 500k papers
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        conn.executescript(f.read())
+
+    conn.execute("INSERT INTO libraries (libraryID, type, editable, filesEditable) VALUES (1, 'user', 1, 1)")
+    conn.executemany("INSERT INTO itemTypes (itemTypeID, typeName) VALUES (?, ?)",
+                     [(i, n) for n, i in ITEM_TYPES.items()])
+    conn.executemany("INSERT INTO itemTypesCombined (itemTypeID, typeName, custom) VALUES (?, ?, 0)",
+                     [(i, n) for n, i in ITEM_TYPES.items()])
+    conn.executemany("INSERT INTO fieldsCombined (fieldID, fieldName, custom) VALUES (?, ?, 0)",
+                     [(i, n) for n, i in FIELDS.items()])
+    conn.execute("INSERT INTO creatorTypes VALUES (?, 'author')", (CREATOR_TYPE_AUTHOR,))
+    conn.executemany("INSERT INTO collections (collectionID, collectionName, libraryID, key) VALUES (?, ?, 1, ?)",
+                     [(i, name, item_key(10**9 + i)) for i, name in enumerate(COLLECTIONS, start=1)])
+    conn.executemany("INSERT INTO tags (tagID, name) VALUES (?, ?)",
+                     [(i, name) for i, name in enumerate(TAGS, start=1)])
+
+    rows = _Rows(conn)
+    ins_item = "INSERT INTO items (itemID, itemTypeID, libraryID, key, dateModified, version) VALUES (?, ?, 1, ?, ?, ?)"
+    ins_value = "INSERT INTO itemDataValues (valueID, value) VALUES (?, ?)"
+    ins_data = "INSERT INTO itemData (itemID, fieldID, valueID) VALUES (?, ?, ?)"
+    ins_creator = "INSERT INTO creators (creatorID, firstName, lastName, fieldMode) VALUES (?, ?, ?, 0)"
+    ins_item_creator = "INSERT INTO itemCreators (itemID, creatorID, creatorTypeID, orderIndex) VALUES (?, ?, ?, ?)"
+    ins_attachment = "INSERT INTO itemAttachments (itemID, parentItemID, linkMode, contentType, path) VALUES (?, ?, 1, 'application/pdf', ?)"
+    ins_annotation = ("INSERT INTO itemAnnotations (itemID, parentItemID, type, text, comment, color, pageLabel,"
+                      " sortIndex, position, isExternal) VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, 0)")
+    ins_collection = "INSERT INTO collectionItems (collectionID, itemID, orderIndex) VALUES (?, ?, ?)"
+    ins_tag = "INSERT INTO itemTags (itemID, tagID, type) VALUES (?, ?, 0)"
+
+    values: dict[str, int] = {}
+    creators = max(10, items // 3)
+    for cid in range(1, creators + 1):
+        rows.add(ins_creator, (cid, f"First{cid}", f"Last{cid}"))
+
+    def value_id(value: str) -> int:
+        vid = values.get(value)
+        if vid is None:
+            vid = values[value] = len(values) + 1
+            rows.add(ins_value, (vid, value))
+        return vid
+
+    # Collection membership goes in before any attachment exists: Zotero's
+    # collectionItems insert trigger scans every attachment row, which is
+    # quadratic if done as we go. Parent itemIDs are known up front.
+    member_rng = random.Random(seed + 1)
+    conn.executemany(ins_collection, [
+        (member_rng.randint(1, len(COLLECTIONS)), p * (highlights + 2) + 1, p)
+        for p in range(items)
+        if member_rng.random() < 0.2
+    ])
+
+    palette, weights = zip(*COLORS)
+    item_id = 0
+    total_highlights = 0
+    for p in range(items):
+        modified = f"20{rng.randint(15, 25):02d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00"
+        item_id += 1
+        parent_id = item_id
+        rows.add(ins_item, (parent_id, ITEM_TYPES["journalArticle"], item_key(parent_id), modified, p + 1))
+        fields = {
+            "title": f"{_sentence(rng, 4, 12)[:-1]} ({p})",
+            "date": f"{rng.randint(1990, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "url": f"https://example.org/paper/{p}",
+            "publicationTitle": rng.choice(VENUES),
+            "DOI": f"10.5555/synthetic.{p}",
+        }
+        if rng.random() < 0.5:
+            fields["abstractNote"] = _sentence(rng, 40, 120)
+        for name, value in fields.items():
+            rows.add(ins_data, (parent_id, FIELDS[name], value_id(value)))
+        for order, cid in enumerate(rng.sample(range(1, creators + 1), rng.randint(1, 4))):
+            rows.add(ins_item_creator, (parent_id, cid, CREATOR_TYPE_AUTHOR, order))
+        if rng.random() < 0.3:
+            rows.add(ins_tag, (parent_id, rng.randint(1, len(TAGS))))
+
+        item_id += 1
+        attach_id = item_id
+        rows.add(ins_item, (attach_id, ITEM_TYPES["attachment"], item_key(attach_id), modified, p + 1))
+        rows.add(ins_attachment, (attach_id, parent_id, "storage:paper.pdf"))
+
+        colors = rng.choices(palette, weights, k=highlights)
+        offset, previous = 0, 0
+        for h in range(highlights):
+            item_id += 1
+            total_highlights += 1
+            page = h // 4
+            if long_every and total_highlights % long_every == 0:
+                text = " ".join(_sentence(rng, 20, 40) for _ in range(12))
+            else:
+                text = _sentence(rng, 8, 40)
+            top = 720 - (h % 4) * 150
+            # Character offset in the page text, as Zotero writes it; each highlight
+            # starts ~2 lines after the previous one ends
+            offset = 0 if h % 4 == 0 else offset + previous + 160
+            previous = len(text)
+            position = json.dumps({"pageIndex": page, "rects": [[72.0, top - 12.0, 540.0, float(top)]]})
+            rows.add(ins_item, (item_id, ITEM_TYPES["annotation"], item_key(item_id), modified, p + 1))
+            rows.add(ins_annotation, (
+                item_id, attach_id, text,
+                _sentence(rng, 3, 10) if rng.random() < 0.1 else None,
+                colors[h], str(page + 1), f"{page:05d}|{offset:06d}|{top:05d}", position,
+            ))
+
+    rows.flush()
+    conn.commit()
+    conn.close()
+    return {
+        "path": path,
+        "items": items,
+        "highlights_per_item": highlights,
+        "highlights": total_highlights,
+        "rows_items": item_id,
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a synthetic zotero.sqlite from schema.txt.")
+    parser.add_argument("out", help="path of the database to write (replaced if it exists)")
+    parser.add_argument("--items", type=int, default=1000, help="number of papers (default: %(default)s)")
+    parser.add_argument("--highlights", type=int, default=20, help="highlights per paper (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    summary = build(args.out, args.items, args.highlights, args.seed)
+    print(f"✅ {summary['items']} papers, {summary['highlights']} highlights, "
+          f"{summary['bytes'] / 1e6:.1f} MB in {summary['seconds']}s → {summary['path']}")
+
+
+if __name__ == "__main__":
+    main()
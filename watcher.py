@@ -0,0 +1,62 @@
+import os
+import time
+
+import zotero_reader
+
+
+class ZoteroWatcher:
+    """
+    Detects new highlights in zotero.sqlite without rescanning the library.
+
+    Each poll() only stats zotero.sqlite and its -wal file. When either
+    changes, the watcher waits until they have been quiet for `debounce`
+    seconds (Zotero writes in bursts), confirms a real commit through
+    PRAGMA data_version, and then reads just the itemAnnotations rows above
+    the last itemID it has seen.
+    """
+
+    def __init__(self, db_path: str | None = None, debounce: float = 3.0):
+        self.db_path = db_path or zotero_reader.ZOTERO_DB_PATH
+        self.debounce = debounce
+        # One connection, so data_version is always asked of the same one
+        self.reader = zotero_reader.ZoteroReader(self.db_path, pool_size=1)
+        self._signature = self._stat()
+        self._changed_at: float | None = None
+        self._data_version = self.reader.data_version()
+        self._last_id = self.reader.max_annotation_id()
+
+    def _stat(self) -> tuple:
+        sig = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                st = os.stat(path)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                sig.append(None)
+        return tuple(sig)
+
+    def poll(self) -> list[dict]:
+        """
+        Return highlights added since the previous call (usually []).
+        Blocking; run it on the DB executor.
+        """
+        signature = self._stat()
+        now = time.monotonic()
+        if signature != self._signature:
+            self._signature = signature
+            self._changed_at = now
+            return []
+        if self._changed_at is None or now - self._changed_at < self.debounce:
+            return []
+        self._changed_at = None
+
+        data_version = self.reader.data_version()
+        if data_version == self._data_version:
+            return []
+        self._data_version = data_version
+
+        annotations, self._last_id = self.reader.annotations_after(self._last_id)
+        return annotations
+
+    def close(self) -> None:
+        self.reader.close()
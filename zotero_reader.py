@@ -1,98 +1,1080 @@
 import sqlite3
 import os
+import json
+import queue
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import colors
+import fulltext
+import metrics
+from colors import hex_to_name  # kept for callers importing it from here
+from overlaps import merge_overlapping
 
 # Update this path to match your Zotero installation
 ZOTERO_DB_PATH = r"C:\Users\sakha\Zotero\zotero.sqlite"
 
-def get_attachment_id_from_key(item_key: str) -> int | None:
-    if not os.path.isfile(ZOTERO_DB_PATH):
-        raise FileNotFoundError(f"Zotero DB not found at: {ZOTERO_DB_PATH}")
-
-    conn = sqlite3.connect(f"file:{ZOTERO_DB_PATH}?mode=ro", uri=True)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT itemID
-        FROM items
-        WHERE key = ?
-          AND itemTypeID = 3
-    """, (item_key,))
-    row = cur.fetchone()
-    conn.close()
-    return row[0] if row else None
-
-def hex_to_name(hex_color: str) -> str | None:
-    if not hex_color or not hex_color.startswith("#"):
-        return None
-    h = hex_color.lstrip("#").lower()
-    if len(h) == 3:
-        h = "".join(ch * 2 for ch in h)
-    mapping = {
-        "ffd400": "yellow",
-        "ff6666": "red",
-        "5fb236": "green",
-        "2ea8e5": "blue",
-        "a28ae5": "purple",
-    }
-    return mapping.get(h)
-
-def get_annotations_by_key(item_key: str) -> list[dict]:
-    attachment_id = get_attachment_id_from_key(item_key)
-    if not attachment_id:
-        return []
-
-    conn = sqlite3.connect(f"file:{ZOTERO_DB_PATH}?mode=ro", uri=True)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT itemID, text, color
-        FROM itemAnnotations
-        WHERE parentItemID = ?
-          AND type = 1
-    """, (attachment_id,))
-    rows = cur.fetchall()
-    conn.close()
-
-    annotations = []
-    for ann_item_id, raw_text, raw_color in rows:
-        color_name = hex_to_name(raw_color)
-        if color_name:
-            annotations.append({
+# Set to a local folder to serve reads from a snapshot copy of the DB
+# instead of the live file (avoids "database is locked" while Zotero runs)
+SNAPSHOT_DIR = None
+
+# Connection pool tuning
+POOL_SIZE = 4
+MMAP_SIZE = 256 * 1024 * 1024     # bytes of the DB file to memory-map
+CACHE_SIZE_KIB = 64 * 1024        # page cache per connection, in KiB
+STATEMENT_CACHE_SIZE = 128        # prepared statements kept per connection
+SNAPSHOT_CHECK_INTERVAL = 2.0     # seconds between staleness checks of the source
+BACKUP_PAGES_PER_STEP = 1024      # pages copied per online-backup step
+KEY_CACHE_SIZE = 4096             # attachment keys kept in the resolution cache
+KEY_INDEX_PATH = "key_index.json" # on-disk copy of the resolution cache
+KEY_INDEX_SAVE_INTERVAL = 5.0     # seconds between index writes
+KEY_INDEX_VERSION = 2             # bump when the cached entry layout changes
+ZOTERO_CACHE_DIR = None           # Zotero's rendered annotation images; None = "cache" next to zotero.sqlite
+ZOTERO_STORAGE_DIR = None         # attachment files and full-text caches; None = "storage" next to zotero.sqlite
+
+# Keep the SQL text constant so sqlite3's per-connection statement cache
+# can hand back the already prepared statement on every call.
+SQL_ITEM_TYPES = "SELECT itemTypeID, typeName FROM itemTypesCombined"
+
+# A key may name a paper or one of its attachments; a paper's PDFs come
+# back as a JSON array in the same row. The libraryID IN (...) term lets
+# SQLite use the UNIQUE (libraryID, key) index instead of a scan.
+SQL_RESOLVE_KEY = """
+    SELECT i.itemID, i.itemTypeID, i.libraryID, ia.parentItemID,
+           (SELECT json_group_array(itemID) FROM (
+                SELECT pdf.itemID
+                FROM itemAttachments pdf
+                WHERE pdf.parentItemID = i.itemID
+                  AND pdf.contentType = 'application/pdf'
+                  AND pdf.itemID NOT IN (SELECT itemID FROM deletedItems)
+                ORDER BY pdf.itemID
+           ))
+    FROM items i
+    LEFT JOIN itemAttachments ia ON ia.itemID = i.itemID
+    WHERE i.libraryID IN (SELECT libraryID FROM libraries)
+      AND i.key = ?
+      AND i.itemID NOT IN (SELECT itemID FROM deletedItems)
+    ORDER BY i.libraryID
+    LIMIT 1
+"""
+
+# color_bucket() is the shared colour classifier registered on each
+# connection, so unwanted colours are dropped before their text is read and
+# rows come back in reading order.
+# All of a paper's attachments are read in one statement, PDF by PDF.
+SQL_ANNOTATIONS = """
+    SELECT itemID, text, color_bucket(color) AS bucket, parentItemID, sortIndex, position
+    FROM itemAnnotations
+    WHERE parentItemID IN (SELECT value FROM json_each(?))
+      AND type = 1
+      AND bucket IN (SELECT value FROM json_each(?))
+    ORDER BY parentItemID, sortIndex, itemID
+"""
+
+SQL_ANNOTATIONS_DETAILED = """
+    SELECT itemID, text, color_bucket(color) AS bucket, pageLabel, comment, parentItemID, sortIndex, position
+    FROM itemAnnotations
+    WHERE parentItemID IN (SELECT value FROM json_each(?))
+      AND type = 1
+      AND bucket IN (SELECT value FROM json_each(?))
+    ORDER BY parentItemID, sortIndex, itemID
+"""
+
+# Image (area) annotations: Zotero renders each one to a PNG in its cache
+# directory, named after the annotation's key
+SQL_IMAGE_ANNOTATIONS = """
+    SELECT ann.itemID, ai.key, color_bucket(ann.color) AS bucket, ann.comment, ann.pageLabel
+    FROM itemAnnotations ann
+    JOIN items ai ON ai.itemID = ann.itemID
+    WHERE ann.parentItemID IN (SELECT value FROM json_each(?))
+      AND ann.type = 3
+      AND bucket IN (SELECT value FROM json_each(?))
+    ORDER BY ann.parentItemID, ann.sortIndex, ann.itemID
+"""
+
+SQL_LIBRARY_GROUP = """
+    SELECT l.type, g.groupID
+    FROM libraries l
+    LEFT JOIN groups g ON g.libraryID = l.libraryID
+    WHERE l.libraryID = ?
+"""
+
+SQL_FIELD_IDS = "SELECT fieldID, fieldName FROM fieldsCombined"
+
+# ID lists are bound as a single JSON array parameter, so one statement
+# (and one prepared plan) serves any number of items.
+SQL_FIELDS_BULK = """
+    SELECT d.itemID, d.fieldID, v.value
+    FROM itemData d
+    JOIN itemDataValues v ON d.valueID = v.valueID
+    WHERE d.itemID IN (SELECT value FROM json_each(?))
+      AND d.fieldID IN (SELECT value FROM json_each(?))
+"""
+
+SQL_AUTHORS_BULK = """
+    SELECT ic.itemID, c.firstName, c.lastName
+    FROM itemCreators ic
+    JOIN creators c ON ic.creatorID = c.creatorID
+    WHERE ic.itemID IN (SELECT value FROM json_each(?))
+    ORDER BY ic.itemID, ic.orderIndex
+"""
+
+# Several collections can share a name (or one's name be another's key);
+# list each paper once, at its earliest position.
+SQL_COLLECTION_ITEMS = """
+    SELECT ci.itemID
+    FROM collectionItems ci
+    JOIN collections c ON ci.collectionID = c.collectionID
+    WHERE (c.collectionName = ? OR c.key = ?)
+      AND ci.itemID NOT IN (SELECT itemID FROM deletedItems)
+    GROUP BY ci.itemID
+    ORDER BY MIN(ci.orderIndex), ci.itemID
+"""
+
+# Tags may sit on the attachment rather than the paper; report the paper.
+SQL_TAG_ITEMS = """
+    SELECT DISTINCT COALESCE(ia.parentItemID, it.itemID)
+    FROM itemTags it
+    JOIN tags t ON it.tagID = t.tagID
+    LEFT JOIN itemAttachments ia ON ia.itemID = it.itemID
+    WHERE t.name = ?
+      AND it.itemID NOT IN (SELECT itemID FROM deletedItems)
+"""
+
+SQL_PDF_ATTACHMENTS_BULK = """
+    SELECT itemID, parentItemID
+    FROM itemAttachments
+    WHERE parentItemID IN (SELECT value FROM json_each(?))
+      AND contentType = 'application/pdf'
+      AND itemID NOT IN (SELECT itemID FROM deletedItems)
+    ORDER BY parentItemID, itemID
+"""
+
+SQL_ANNOTATIONS_BULK = """
+    SELECT parentItemID, itemID, text, color_bucket(color) AS bucket, sortIndex, position
+    FROM itemAnnotations
+    WHERE parentItemID IN (SELECT value FROM json_each(?))
+      AND type = 1
+      AND bucket IN (SELECT value FROM json_each(?))
+    ORDER BY parentItemID, sortIndex, itemID
+"""
+
+SQL_ITEM_KEYS = "SELECT itemID, key FROM items WHERE itemID IN (SELECT value FROM json_each(?))"
+
+SQL_LIBRARY_MARKS = """
+    SELECT libraryID, MAX(clientDateModified), MAX(version)
+    FROM items
+    GROUP BY libraryID
+"""
+
+# Count / id-sum of the highlights under papers' PDFs, per library; deleting
+# a highlight leaves no modified item behind, but it does move these
+SQL_LIBRARY_HIGHLIGHT_TOTALS = """
+    SELECT i.libraryID, COUNT(*), TOTAL(ann.itemID)
+    FROM itemAnnotations ann
+    JOIN items i ON i.itemID = ann.itemID
+    JOIN itemAttachments att ON att.itemID = ann.parentItemID
+    WHERE att.parentItemID IS NOT NULL
+    GROUP BY i.libraryID
+"""
+
+# Any modified item (paper, attachment, annotation or note) maps up to its paper.
+SQL_MODIFIED_PARENTS = """
+    SELECT DISTINCT COALESCE(annAtt.parentItemID, ann.parentItemID, att.parentItemID, note.parentItemID, i.itemID)
+    FROM items i
+    LEFT JOIN itemAnnotations ann ON ann.itemID = i.itemID
+    LEFT JOIN itemAttachments annAtt ON annAtt.itemID = ann.parentItemID
+    LEFT JOIN itemAttachments att ON att.itemID = i.itemID
+    LEFT JOIN itemNotes note ON note.itemID = i.itemID
+    WHERE i.libraryID = ?
+      AND (i.clientDateModified >= ? OR i.version > ?)
+"""
+
+# Cheap change detector per paper: its own modification time plus the
+# count / id-sum / latest modification of all highlights under its PDFs.
+SQL_FINGERPRINTS = """
+    SELECT p.itemID, p.clientDateModified,
+           COUNT(ann.itemID), TOTAL(ann.itemID), MAX(ai.clientDateModified)
+    FROM items p
+    LEFT JOIN itemAttachments att ON att.parentItemID = p.itemID
+    LEFT JOIN itemAnnotations ann ON ann.parentItemID = att.itemID
+    LEFT JOIN items ai ON ai.itemID = ann.itemID
+    WHERE p.itemID IN (SELECT value FROM json_each(?))
+    GROUP BY p.itemID
+"""
+
+# Fingerprint of one paper's highlight set plus its own last edit
+SQL_KEY_FINGERPRINT = """
+    SELECT COUNT(ann.itemID), MAX(ann.itemID), MAX(ai.clientDateModified),
+           (SELECT clientDateModified || '/' || version FROM items WHERE itemID = ?)
+    FROM itemAnnotations ann
+    JOIN items ai ON ai.itemID = ann.itemID
+    WHERE ann.parentItemID IN (SELECT value FROM json_each(?))
+"""
+
+SQL_MAX_ANNOTATION_ID = "SELECT COALESCE(MAX(itemID), 0) FROM itemAnnotations"
+
+SQL_ANNOTATIONS_AFTER = """
+    SELECT ann.itemID, ann.text, color_bucket(ann.color), COALESCE(att.parentItemID, ann.parentItemID)
+    FROM itemAnnotations ann
+    LEFT JOIN itemAttachments att ON att.itemID = ann.parentItemID
+    WHERE ann.itemID > ?
+      AND ann.type = 1
+    ORDER BY ann.itemID
+"""
+
+SQL_PAPER_HIGHLIGHTS = """
+    SELECT att.parentItemID, ai.key, ann.itemID, ann.text, ann.comment,
+           color_bucket(ann.color), ann.pageLabel
+    FROM itemAnnotations ann
+    JOIN itemAttachments att ON att.itemID = ann.parentItemID
+    JOIN items ai ON ai.itemID = att.itemID
+    WHERE att.parentItemID IN (SELECT value FROM json_each(?))
+      AND ann.type = 1
+    ORDER BY att.parentItemID, att.itemID, ann.sortIndex, ann.itemID
+"""
+
+# Keyset pagination over papers that have a PDF, in itemID order
+SQL_PDF_PARENTS_AFTER = """
+    SELECT DISTINCT parentItemID
+    FROM itemAttachments
+    WHERE parentItemID > ?
+      AND contentType = 'application/pdf'
+    ORDER BY parentItemID
+    LIMIT ?
+"""
+
+# Colour buckets highlights are sorted into
+BUCKETS = ["yellow", "green", "blue", "purple", "red"]
+
+# Output key -> Zotero fieldName for the metadata we hand out
+METADATA_FIELDS = {
+    "title": "title",
+    "url": "url",
+    "year": "date",
+    "venue": "publicationTitle",
+    "doi": "DOI",
+}
+
+
+class Snapshot:
+    """
+    Local working copy of zotero.sqlite.
+
+    The copy is made with the SQLite online backup API (a few pages per step,
+    so Zotero's writer is never held up for long) and is only refreshed when
+    the source's mtime/size and PRAGMA data_version show it has changed.
+    Each refresh writes a new generation file; readers move over to it the
+    next time they borrow a connection and old generations are deleted.
+    If Zotero holds an exclusive lock, the files are copied instead.
+    """
+
+    def __init__(self, source_path: str, snapshot_dir: str,
+                 check_interval: float = SNAPSHOT_CHECK_INTERVAL):
+        self.source_path = source_path
+        self.snapshot_dir = snapshot_dir
+        self.check_interval = check_interval
+        self._current: tuple[int, str] | None = None
+        self._signature: tuple | None = None
+        self._data_version: int | None = None
+        self._source_conn: sqlite3.Connection | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(snapshot_dir, exist_ok=True)
+        self._cleanup(None)
+
+    def _stat(self) -> tuple:
+        sig = []
+        for path in (self.source_path, self.source_path + "-wal"):
+            try:
+                st = os.stat(path)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                sig.append(None)
+        return tuple(sig)
+
+    def _source(self) -> sqlite3.Connection:
+        if self._source_conn is None:
+            self._source_conn = sqlite3.connect(
+                f"file:{self.source_path}?mode=ro", uri=True, check_same_thread=False
+            )
+        return self._source_conn
+
+    def _source_data_version(self) -> int | None:
+        try:
+            return self._source().execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.OperationalError:
+            return None
+
+    def _is_stale(self) -> bool:
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        data_version = self._source_data_version()
+        if data_version is not None and data_version == self._data_version:
+            # Touched but nothing committed (e.g. a checkpoint)
+            self._signature = signature
+            return False
+        return True
+
+    def _cleanup(self, keep: str | None) -> None:
+        for name in os.listdir(self.snapshot_dir):
+            if not (name.startswith("zotero-snapshot-") and name.endswith(".sqlite")):
+                continue
+            path = os.path.join(self.snapshot_dir, name)
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # still open (Windows); retried on the next refresh
+
+    def _refresh(self) -> None:
+        generation = self._current[0] + 1 if self._current else 1
+        path = os.path.join(self.snapshot_dir, f"zotero-snapshot-{generation}.sqlite")
+        # Stat before copying, so writes that land mid-copy trigger another refresh
+        signature = self._stat()
+        data_version = self._source_data_version()
+
+        dst = sqlite3.connect(path)
+        try:
+            if data_version is not None:
+                self._source().backup(dst, pages=BACKUP_PAGES_PER_STEP, sleep=0.001)
+            else:
+                dst.close()
+                shutil.copyfile(self.source_path, path)
+                if os.path.isfile(self.source_path + "-wal"):
+                    shutil.copyfile(self.source_path + "-wal", path + "-wal")
+                dst = sqlite3.connect(path)
+            # Fold any WAL into the file so read-only connections can open it
+            dst.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            dst.close()
+
+        # New copy first, then its stamp: a reader seeing the new stamp must get the new copy
+        self._current = (generation, path)
+        self._signature = signature
+        self._data_version = data_version
+        self._cleanup(path)
+
+    def current(self) -> tuple[int, str]:
+        """
+        (generation, path) of an up-to-date working copy.
+        """
+        current = self._current
+        if current is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return current
+
+        if current is None:
+            if not os.path.isfile(self.source_path):
+                raise FileNotFoundError(f"Zotero DB not found at: {self.source_path}")
+            self._lock.acquire()
+        elif not self._lock.acquire(blocking=False):
+            return current  # another thread is refreshing; keep serving the old copy
+        try:
+            if self._current is None or self._is_stale():
+                self._refresh()
+            self._checked_at = time.monotonic()
+            return self._current
+        finally:
+            self._lock.release()
+
+    def source_stamp(self) -> list:
+        """
+        mtime/size of the source DB (and its -wal) as of the current working
+        copy, i.e. the state of the DB that queries actually see.
+        """
+        self.current()
+        return [list(sig) if sig else None for sig in self._signature]
+
+    def close(self) -> None:
+        if self._source_conn is not None:
+            self._source_conn.close()
+            self._source_conn = None
+
+
+class ResolutionCache:
+    """
+    Bounded LRU of item key -> ((attachmentIDs...), parentItemID, libraryID).
+
+    Backed by a small JSON index so it survives restarts. The whole cache is
+    stamped with the source DB's mtime/size (and its -wal file's); any change
+    there means Zotero committed something, and all entries are dropped.
+    With a snapshot, the stamp is that of the DB the snapshot was copied
+    from (Snapshot.source_stamp), so entries read from a copy that lags
+    behind are dropped once it catches up.
+    """
+
+    def __init__(self, db_path: str, index_path: str | None = None, max_size: int = KEY_CACHE_SIZE,
+                 snapshot: Snapshot | None = None):
+        self.db_path = db_path
+        self.index_path = index_path
+        self.max_size = max_size
+        self.snapshot = snapshot
+        self._entries: OrderedDict[str, tuple[tuple[int, ...], int | None, int]] = OrderedDict()
+        self._stamp: list | None = None  # taken (and the index loaded) on first use
+        self.generation = 0  # bumped whenever the DB stamp changes
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = 0.0
+
+    def _current_stamp(self) -> list:
+        if self.snapshot is not None:
+            return self.snapshot.source_stamp()
+        stamp = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                st = os.stat(path)
+                stamp.append([st.st_mtime_ns, st.st_size])
+            except FileNotFoundError:
+                stamp.append(None)
+        return stamp
+
+    def _load(self) -> None:
+        if not self.index_path or not os.path.isfile(self.index_path):
+            return
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (data.get("version") == KEY_INDEX_VERSION and data.get("db_path") == self.db_path
+                and data.get("stamp") == self._stamp):
+            for key, (attach_ids, parent_id, library_id) in data.get("entries", []):
+                self._entries[key] = (tuple(attach_ids), parent_id, library_id)
+
+    def save(self) -> None:
+        if not self.index_path:
+            return
+        with self._lock:
+            if not self._dirty or self._stamp is None:
+                return
+            data = {"version": KEY_INDEX_VERSION, "db_path": self.db_path, "stamp": self._stamp,
+                    "entries": list(self._entries.items())}
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.index_path)
+
+    def _check_stamp(self) -> None:
+        stamp = self._current_stamp()
+        if self._stamp is None:
+            self._stamp = stamp
+            self._load()
+        elif stamp != self._stamp:
+            self._entries.clear()
+            self._stamp = stamp
+            self.generation += 1
+            self._dirty = True
+
+    def current_generation(self) -> int:
+        """
+        Generation of the DB as last seen; changes whenever Zotero commits.
+        """
+        with self._lock:
+            self._check_stamp()
+            return self.generation
+
+    def get(self, key: str) -> tuple[tuple[int, ...], int | None, int] | None:
+        with self._lock:
+            self._check_stamp()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: tuple[tuple[int, ...], int | None, int], generation: int) -> None:
+        """
+        Cache an entry looked up during `generation`; dropped if the DB has
+        changed since.
+        """
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            due = time.monotonic() - self._saved_at >= KEY_INDEX_SAVE_INTERVAL
+        if due:
+            self.save()
+
+
+class ZoteroReader:
+    """
+    Long-lived, read-only access to zotero.sqlite.
+
+    Owns a small pool of read-only connections that stay open between
+    commands, so bursts of \\pull / \\push don't pay for connection setup
+    and a cold page cache on every lookup. With snapshot_dir set, queries
+    are served from a local Snapshot instead of the live database, so they
+    never contend with a running Zotero.
+    """
+
+    def __init__(self, db_path: str = ZOTERO_DB_PATH, pool_size: int = POOL_SIZE,
+                 snapshot_dir: str | None = None, key_index_path: str | None = None):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.snapshot = Snapshot(db_path, snapshot_dir) if snapshot_dir else None
+        self.keys = ResolutionCache(db_path, key_index_path, snapshot=self.snapshot)
+        self._pool: queue.LifoQueue = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._field_ids: dict[str, list[int]] | None = None
+        self._type_ids: dict[str, int] | None = None
+        self._fingerprints: dict[str, str | None] = {}
+        self._fingerprints_generation = -1
+        self._fingerprints_lock = threading.Lock()
+        self._colors_warmed = False
+
+    def _connect(self, path: str) -> sqlite3.Connection:
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Zotero DB not found at: {path}")
+
+        conn = sqlite3.connect(
+            f"file:{path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+        conn.create_function("color_bucket", 1, colors.hex_to_name, deterministic=True)
+        conn.set_trace_callback(metrics.count_query)
+        if not self._colors_warmed:
+            colors.classifier.warm(conn)
+            self._colors_warmed = True
+        if self._type_ids is None:
+            # itemTypeIDs differ between Zotero versions; look them up by name
+            self._type_ids = {name: type_id for type_id, name in conn.execute(SQL_ITEM_TYPES)}
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        conn.close()
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a pooled connection; it is returned to the pool afterwards.
+        """
+        generation, path = self.snapshot.current() if self.snapshot else (0, self.db_path)
+        entry = None
+        while entry is None:
+            try:
+                entry = self._pool.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.pool_size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        entry = (generation, self._connect(path))
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                else:
+                    entry = self._pool.get()
+            if entry[0] < generation:
+                # Opened on an older snapshot; replace it
+                self._discard(entry[1])
+                entry = None
+        try:
+            yield entry[1]
+        finally:
+            self._pool.put(entry)
+
+    def close(self) -> None:
+        while True:
+            try:
+                _, conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+        self.keys.save()
+        if self.snapshot is not None:
+            self.snapshot.close()
+
+    # ── lookups on a borrowed connection ──
+
+    def _resolve(self, conn: sqlite3.Connection | None,
+                 item_key: str) -> tuple[tuple[int, ...], int | None, int] | None:
+        """
+        ((PDF attachmentIDs...), parentItemID, libraryID) for a paper key or
+        an attachment key, served from the resolution cache when possible.
+        A paper resolves to all of its PDFs. With conn=None a connection is
+        only borrowed on a cache miss.
+        """
+        entry = self.keys.get(item_key)
+        if entry is not None:
+            return entry
+        generation = self.keys.generation
+        if conn is None:
+            with self.connection() as conn:
+                entry = self._resolve_uncached(conn, item_key)
+        else:
+            entry = self._resolve_uncached(conn, item_key)
+        if entry is not None:
+            self.keys.put(item_key, entry, generation)
+        return entry
+
+    def _resolve_uncached(self, conn: sqlite3.Connection,
+                          item_key: str) -> tuple[tuple[int, ...], int | None, int] | None:
+        row = conn.execute(SQL_RESOLVE_KEY, (item_key,)).fetchone()
+        if not row:
+            return None
+        item_id, type_id, library_id, parent_id, pdf_ids = row
+        types = self._type_ids or {}
+        if type_id == types.get("attachment"):
+            return (item_id,), parent_id, library_id
+        if type_id in (types.get("annotation"), types.get("note")):
+            return None
+        attach_ids = tuple(json.loads(pdf_ids))
+        if not attach_ids:
+            return None
+        return attach_ids, item_id, library_id
+
+    def _annotations(self, conn: sqlite3.Connection, attach_ids: tuple[int, ...],
+                     colors: list[str] | None = None, details: bool = False) -> list[dict]:
+        attach_json = json.dumps(list(attach_ids))
+        wanted = json.dumps(colors if colors is not None else BUCKETS)
+        annotations = []
+        if details:
+            rows = conn.execute(SQL_ANNOTATIONS_DETAILED, (attach_json, wanted))
+            for ann_item_id, raw_text, color_name, page_label, comment, attach_id, sort_index, position in rows:
+                annotations.append({
+                    "itemID": ann_item_id,
+                    "text": raw_text.strip() if raw_text else "",
+                    "color": color_name,
+                    "pageLabel": page_label,
+                    "comment": comment,
+                    "attachmentID": attach_id,
+                    "sortIndex": sort_index,
+                    "position": position,
+                })
+        else:
+            rows = conn.execute(SQL_ANNOTATIONS, (attach_json, wanted))
+            for ann_item_id, raw_text, color_name, attach_id, sort_index, position in rows:
+                annotations.append({
+                    "itemID": ann_item_id,
+                    "text": raw_text.strip() if raw_text else "",
+                    "color": color_name,
+                    "attachmentID": attach_id,
+                    "sortIndex": sort_index,
+                    "position": position,
+                })
+        return annotations
+
+    def _with_context(self, conn: sqlite3.Connection, attach_ids: tuple[int, ...],
+                      annotations: list[dict], mark: str) -> list[dict]:
+        # Expand highlights to whole sentences from each PDF's .zotero-ft-cache
+        storage = ZOTERO_STORAGE_DIR or os.path.join(os.path.dirname(self.db_path), "storage")
+        rows = conn.execute(SQL_ITEM_KEYS, (json.dumps(list(attach_ids)),))
+        paths = {attach_id: os.path.join(storage, key, fulltext.FT_CACHE_NAME) for attach_id, key in rows}
+        return fulltext.expander.expand(annotations, paths, mark)
+
+    def _field_id_map(self, conn: sqlite3.Connection) -> dict[str, list[int]]:
+        # fieldName -> fieldID(s), resolved once per reader
+        if self._field_ids is None:
+            field_ids: dict[str, list[int]] = {}
+            for field_id, field_name in conn.execute(SQL_FIELD_IDS):
+                field_ids.setdefault(field_name, []).append(field_id)
+            self._field_ids = field_ids
+        return self._field_ids
+
+    def _load_fields(self, conn: sqlite3.Connection, parent_ids: list[int],
+                     field_names: list[str]) -> dict[int, dict[str, str | None]]:
+        field_ids = self._field_id_map(conn)
+        id_to_name = {fid: name for name in field_names for fid in field_ids.get(name, [])}
+        result = {pid: dict.fromkeys(field_names) for pid in parent_ids}
+        if not parent_ids or not id_to_name:
+            return result
+
+        rows = conn.execute(SQL_FIELDS_BULK, (json.dumps(list(parent_ids)), json.dumps(list(id_to_name))))
+        for item_id, field_id, value in rows:
+            result[item_id][id_to_name[field_id]] = value
+        return result
+
+    def _load_authors(self, conn: sqlite3.Connection, parent_ids: list[int]) -> dict[int, list[str]]:
+        result = {pid: [] for pid in parent_ids}
+        if not parent_ids:
+            return result
+        for item_id, fn, ln in conn.execute(SQL_AUTHORS_BULK, (json.dumps(list(parent_ids)),)):
+            result[item_id].append(f"{fn or ''} {ln or ''}".strip())
+        return result
+
+    def _metadata(self, conn: sqlite3.Connection, parent_ids: list[int], with_key: bool = False) -> dict[int, dict]:
+        fields = self._load_fields(conn, parent_ids, list(METADATA_FIELDS.values()))
+        authors = self._load_authors(conn, parent_ids)
+        # The paper's own item key, e.g. to find its row in the sheet again
+        keys = dict(conn.execute(SQL_ITEM_KEYS, (json.dumps(list(parent_ids)),)).fetchall()) if with_key else {}
+        result = {}
+        for pid in parent_ids:
+            metadata = {key: fields[pid][name] for key, name in METADATA_FIELDS.items()}
+            metadata["authors"] = ", ".join(authors[pid])
+            if with_key:
+                metadata["itemKey"] = keys.get(pid)
+            result[pid] = metadata
+        return result
+
+    # ── public API ──
+
+    def load_fields(self, parent_ids: list[int], field_names: list[str]) -> dict[int, dict[str, str | None]]:
+        """
+        Fetch every requested field for many parent items in one query,
+        keyed by itemID and then by fieldName (missing fields are None).
+        """
+        with self.connection() as conn:
+            return self._load_fields(conn, parent_ids, field_names)
+
+    def load_metadata(self, parent_ids: list[int]) -> dict[int, dict]:
+        """
+        Title/url/authors/year/venue/doi for many parent items in two queries.
+        """
+        with self.connection() as conn:
+            return self._metadata(conn, parent_ids)
+
+    def attachment_id(self, item_key: str) -> int | None:
+        """
+        The attachment's itemID, or a paper's first PDF.
+        """
+        entry = self._resolve(None, item_key)
+        return entry[0][0] if entry else None
+
+    def attachment_ids(self, item_key: str) -> list[int]:
+        entry = self._resolve(None, item_key)
+        return list(entry[0]) if entry else []
+
+    def parent_id(self, item_key: str) -> int | None:
+        """
+        The paper's itemID for a paper or attachment key.
+        """
+        entry = self._resolve(None, item_key)
+        return entry[1] if entry else None
+
+    def annotations(self, item_key: str, colors: list[str] | None = None, details: bool = False,
+                    context: bool = False, merge: bool = False) -> list[dict]:
+        """
+        Highlights of an attachment, or of every PDF of a paper, in reading
+        order, limited to the given colour buckets (default: all).
+        details=True adds pageLabel/comment. merge=True merges overlapping
+        highlights (see overlaps.merge_overlapping). context=True expands
+        each highlight to the sentences around it, the highlight in bold.
+        """
+        with self.connection() as conn:
+            entry = self._resolve(conn, item_key)
+            if not entry:
+                return []
+            annotations = self._annotations(conn, entry[0], colors, details)
+            if merge:
+                annotations = merge_overlapping(annotations)
+            if context:
+                annotations = self._with_context(conn, entry[0], annotations, "**")
+            return annotations
+
+    def _image_dir(self, conn: sqlite3.Connection, library_id: int) -> str:
+        # <data dir>/cache/library/ for My Library, cache/groups/<groupID>/ for a group
+        base = ZOTERO_CACHE_DIR or os.path.join(os.path.dirname(self.db_path), "cache")
+        row = conn.execute(SQL_LIBRARY_GROUP, (library_id,)).fetchone()
+        if row and row[0] == "group" and row[1] is not None:
+            return os.path.join(base, "groups", str(row[1]))
+        return os.path.join(base, "library")
+
+    def image_annotations(self, item_key: str, colors: list[str] | None = None) -> list[dict]:
+        """
+        Image (area) annotations of an attachment or paper, in reading
+        order, with the path of the PNG Zotero rendered for each. The file
+        only exists once Zotero has rendered it (i.e. the PDF was opened).
+        """
+        with self.connection() as conn:
+            entry = self._resolve(conn, item_key)
+            if not entry:
+                return []
+            attach_ids, _, library_id = entry
+            wanted = json.dumps(colors if colors is not None else BUCKETS)
+            rows = conn.execute(SQL_IMAGE_ANNOTATIONS, (json.dumps(list(attach_ids)), wanted)).fetchall()
+            if not rows:
+                return []
+            image_dir = self._image_dir(conn, library_id)
+        return [
+            {
                 "itemID": ann_item_id,
-                "text": raw_text.strip() if raw_text else "",
-                "color": color_name
+                "key": key,
+                "color": color_name,
+                "comment": comment,
+                "pageLabel": page_label,
+                "path": os.path.join(image_dir, f"{key}.png"),
+            }
+            for ann_item_id, key, color_name, comment, page_label in rows
+        ]
+
+    def item_metadata(self, item_key: str) -> dict[str, str | None]:
+        with self.connection() as conn:
+            entry = self._resolve(conn, item_key)
+            parent_id = entry[1] if entry else None
+            if not parent_id:
+                return {"title": None, "url": None}
+            return self._load_fields(conn, [parent_id], ["title", "url"])[parent_id]
+
+    def full_metadata(self, item_key: str, context: bool = False, merge: bool = False) -> dict:
+        with self.connection() as conn:
+            entry = self._resolve(conn, item_key)
+            attach_ids, parent_id = entry[:2] if entry else ((), None)
+            if not parent_id:
+                return {}
+
+            metadata = self._metadata(conn, [parent_id], with_key=True)[parent_id]
+            annotations = self._annotations(conn, attach_ids)
+            if merge:
+                annotations = merge_overlapping(annotations)
+            if context:
+                annotations = self._with_context(conn, attach_ids, annotations, "")
+
+        return add_highlight_columns(metadata, annotations)
+
+    def item_view(self, item_key: str) -> dict | None:
+        """
+        A paper's metadata plus its highlights bucketed by colour, each with
+        itemID, text, pageLabel and comment; None for an unknown key or a
+        standalone attachment.
+        """
+        with self.connection() as conn:
+            entry = self._resolve(conn, item_key)
+            if not entry or not entry[1]:
+                return None
+            attach_ids, parent_id, _ = entry
+            metadata = self._metadata(conn, [parent_id])[parent_id]
+            annotations = self._annotations(conn, attach_ids, details=True)
+
+        highlights: dict[str, list[dict]] = {bucket: [] for bucket in BUCKETS}
+        for ann in annotations:
+            highlights[ann["color"]].append({
+                "itemID": ann["itemID"],
+                "text": ann["text"],
+                "pageLabel": ann["pageLabel"],
+                "comment": ann["comment"],
             })
-    return annotations
+        return {"itemID": parent_id, "attachmentIDs": list(attach_ids), **metadata, "highlights": highlights}
 
-def get_item_metadata(item_key: str) -> dict[str, str | None]:
-    attach_id = get_attachment_id_from_key(item_key)
-    if not attach_id:
-        return {"title": None, "url": None}
+    def key_fingerprint(self, item_key: str) -> str | None:
+        """
+        Fingerprint of a key's highlights (count, max itemID, latest edit)
+        and of its paper's own last edit. Remembered until Zotero next
+        writes to the DB, so asking again for an unchanged library costs two
+        stat() calls and no query. With a snapshot, until the snapshot has
+        caught up with such a write (see ResolutionCache).
+        """
+        generation = self.keys.current_generation()
+        with self._fingerprints_lock:
+            if generation != self._fingerprints_generation or len(self._fingerprints) > KEY_CACHE_SIZE:
+                self._fingerprints = {}
+                self._fingerprints_generation = generation
+            if item_key in self._fingerprints:
+                return self._fingerprints[item_key]
 
-    conn = sqlite3.connect(f"file:{ZOTERO_DB_PATH}?mode=ro", uri=True)
-    cur = conn.cursor()
+        with self.connection() as conn:
+            entry = self._resolve(conn, item_key)
+            fingerprint = None
+            if entry:
+                attach_ids, parent_id, _ = entry
+                count, max_id, max_modified, parent_mark = conn.execute(
+                    SQL_KEY_FINGERPRINT, (parent_id, json.dumps(list(attach_ids)))
+                ).fetchone()
+                fingerprint = f"{','.join(map(str, attach_ids))}|{count}|{max_id}|{max_modified}|{parent_mark}"
+        with self._fingerprints_lock:
+            # Computed for a generation that has since ended: don't remember it
+            if self._fingerprints_generation == generation:
+                self._fingerprints[item_key] = fingerprint
+        return fingerprint
 
-    cur.execute("SELECT parentItemID FROM itemAttachments WHERE itemID = ?", (attach_id,))
-    row = cur.fetchone()
-    parent_id = row[0] if row else None
-    if not parent_id:
-        conn.close()
-        return {"title": None, "url": None}
-
-    def fetch_field(field_name: str):
-        cur.execute("""
-            SELECT v.value
-            FROM itemData d
-            JOIN itemDataValues v ON d.valueID = v.valueID
-            JOIN fieldsCombined f ON d.fieldID = f.fieldID
-            WHERE d.itemID = ?
-              AND f.fieldName = ?
-        """, (parent_id, field_name))
-        row = cur.fetchone()
-        return row[0] if row else None
-
-    title = fetch_field("title")
-    url = fetch_field("url")
-    conn.close()
-    return {"title": title, "url": url}
+    def library_marks(self) -> dict[int, tuple[str, int]]:
+        """
+        High-water mark (max clientDateModified, max version) per libraryID.
+        """
+        with self.connection() as conn:
+            return {lib: (modified, version) for lib, modified, version in conn.execute(SQL_LIBRARY_MARKS)}
+
+    def modified_parent_ids(self, library_id: int, since_modified: str, since_version: int) -> list[int]:
+        """
+        Papers in a library with any item touched at or after the given mark.
+        """
+        with self.connection() as conn:
+            rows = conn.execute(SQL_MODIFIED_PARENTS, (library_id, since_modified, since_version))
+            return [r[0] for r in rows]
+
+    def highlight_totals(self) -> dict[int, tuple[int, int]]:
+        """
+        (count, itemID sum) of the highlights under papers' PDFs, per libraryID.
+        """
+        with self.connection() as conn:
+            return {lib: (count, int(id_sum)) for lib, count, id_sum in conn.execute(SQL_LIBRARY_HIGHLIGHT_TOTALS)}
+
+    def item_keys(self, item_ids: list[int]) -> dict[int, str]:
+        with self.connection() as conn:
+            return dict(conn.execute(SQL_ITEM_KEYS, (json.dumps(list(item_ids)),)).fetchall())
+
+    def fingerprints(self, parent_ids: list[int]) -> dict[int, str]:
+        """
+        Fingerprint of each paper's metadata and annotation set.
+        """
+        with self.connection() as conn:
+            rows = conn.execute(SQL_FINGERPRINTS, (json.dumps(list(parent_ids)),))
+            return {
+                pid: f"{modified}|{count}|{int(id_sum)}|{ann_modified or ''}"
+                for pid, modified, count, id_sum, ann_modified in rows
+            }
+
+    def data_version(self) -> int:
+        """
+        PRAGMA data_version of a pooled connection; it changes whenever
+        another connection (i.e. Zotero) commits. Only meaningful when the
+        same connection is asked each time, e.g. with pool_size=1.
+        """
+        with self.connection() as conn:
+            return conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def max_annotation_id(self) -> int:
+        with self.connection() as conn:
+            return conn.execute(SQL_MAX_ANNOTATION_ID).fetchone()[0]
+
+    def annotations_after(self, after_id: int) -> tuple[list[dict], int]:
+        """
+        Highlights with itemID > after_id, each tagged with its paper's
+        itemID, plus the highest itemID seen (the next after_id).
+        """
+        annotations, last_id = [], after_id
+        with self.connection() as conn:
+            for ann_item_id, raw_text, color_name, paper_id in conn.execute(SQL_ANNOTATIONS_AFTER, (after_id,)):
+                last_id = ann_item_id
+                if color_name:
+                    annotations.append({
+                        "itemID": ann_item_id,
+                        "text": raw_text.strip() if raw_text else "",
+                        "color": color_name,
+                        "paperID": paper_id,
+                    })
+        return annotations, last_id
+
+    def paper_highlights(self, parent_ids: list[int]) -> dict[int, list[dict]]:
+        """
+        Every highlight (any colour) under each paper's attachments, in
+        reading order, with the attachment key, comment and pageLabel.
+        """
+        result: dict[int, list[dict]] = {pid: [] for pid in parent_ids}
+        with self.connection() as conn:
+            rows = conn.execute(SQL_PAPER_HIGHLIGHTS, (json.dumps(list(parent_ids)),))
+            for pid, attach_key, ann_item_id, raw_text, comment, color_name, page_label in rows:
+                result[pid].append({
+                    "itemID": ann_item_id,
+                    "attachmentKey": attach_key,
+                    "text": raw_text.strip() if raw_text else "",
+                    "comment": comment,
+                    "color": color_name,
+                    "pageLabel": page_label,
+                })
+        return result
+
+    def pdf_parent_ids_after(self, after_id: int, limit: int) -> list[int]:
+        """
+        Next `limit` papers with a PDF attachment whose itemID > after_id.
+        """
+        with self.connection() as conn:
+            return [r[0] for r in conn.execute(SQL_PDF_PARENTS_AFTER, (after_id, limit))]
+
+    def group_item_ids(self, name: str) -> tuple[str, list[int]]:
+        """
+        Resolve a collection (by name or key) or, failing that, a tag to
+        its member parent itemIDs. Returns ("collection" | "tag" | "", ids).
+        """
+        with self.connection() as conn:
+            ids = [r[0] for r in conn.execute(SQL_COLLECTION_ITEMS, (name, name))]
+            if ids:
+                return "collection", ids
+            ids = [r[0] for r in conn.execute(SQL_TAG_ITEMS, (name,))]
+            return ("tag", ids) if ids else ("", [])
+
+    def bulk_full_metadata(self, parent_ids: list[int], merge: bool = False) -> dict[int, dict]:
+        """
+        get_full_metadata for many papers at once: PDFs, fields, authors and
+        highlights are each loaded with one set-based query. Papers without
+        a PDF attachment are left out.
+        """
+        with self.connection() as conn:
+            attachments: dict[int, list[int]] = {}
+            for attach_id, parent_id in conn.execute(SQL_PDF_ATTACHMENTS_BULK, (json.dumps(list(parent_ids)),)):
+                attachments.setdefault(parent_id, []).append(attach_id)
+            with_pdf = [pid for pid in parent_ids if pid in attachments]
+            if not with_pdf:
+                return {}
+
+            metadata = self._metadata(conn, with_pdf, with_key=True)
+            attach_to_parent = {aid: pid for pid, aids in attachments.items() for aid in aids}
+            annotations: dict[int, list[dict]] = {pid: [] for pid in with_pdf}
+            rows = conn.execute(SQL_ANNOTATIONS_BULK, (json.dumps(list(attach_to_parent)), json.dumps(BUCKETS)))
+            for attach_id, ann_item_id, raw_text, color_name, sort_index, position in rows:
+                annotations[attach_to_parent[attach_id]].append({
+                    "itemID": ann_item_id,
+                    "text": raw_text.strip() if raw_text else "",
+                    "color": color_name,
+                    "attachmentID": attach_id,
+                    "sortIndex": sort_index,
+                    "position": position,
+                })
+
+        if merge:
+            annotations = {pid: merge_overlapping(anns) for pid, anns in annotations.items()}
+        return {pid: add_highlight_columns(metadata[pid], annotations[pid]) for pid in with_pdf}
+
+
+_reader: ZoteroReader | None = None
+_reader_lock = threading.Lock()
+
+def get_reader() -> ZoteroReader:
+    """
+    Return the shared reader, (re)creating it if ZOTERO_DB_PATH changed.
+    """
+    global _reader
+    with _reader_lock:
+        if _reader is None or _reader.db_path != ZOTERO_DB_PATH:
+            if _reader is not None:
+                _reader.close()
+            _reader = ZoteroReader(ZOTERO_DB_PATH, snapshot_dir=SNAPSHOT_DIR, key_index_path=KEY_INDEX_PATH)
+        return _reader
+
+def get_attachment_id_from_key(item_key: str) -> int | None:
+    return get_reader().attachment_id(item_key)
+
+def get_attachment_ids_from_key(item_key: str) -> list[int]:
+    return get_reader().attachment_ids(item_key)
+
+def get_parent_id(item_key: str) -> int | None:
+    return get_reader().parent_id(item_key)
+
+def get_key_fingerprint(item_key: str) -> str | None:
+    return get_reader().key_fingerprint(item_key)
+
+def get_annotations_by_key(item_key: str, colors: list[str] | None = None, details: bool = False,
+                           context: bool = False, merge: bool = False) -> list[dict]:
+    return get_reader().annotations(item_key, colors, details, context, merge)
+
+def get_image_annotations(item_key: str, colors: list[str] | None = None) -> list[dict]:
+    return get_reader().image_annotations(item_key, colors)
+
+def get_item_view(item_key: str) -> dict | None:
+    return get_reader().item_view(item_key)
+
+def get_item_metadata(item_key: str) -> dict[str, str | None]:
+    return get_reader().item_metadata(item_key)
 
 def format_bullets(texts: list[str]) -> str:
     bullets = [f"{idx}. {text}" for idx, text in enumerate(texts, start=1)]
@@ -100,52 +1082,7 @@ def format_bullets(texts: list[str]) -> str:
         return "\n\n".join(bullets) + "\n\n"
     return ""
 
-def get_full_metadata(item_key: str) -> dict:
-    attach_id = get_attachment_id_from_key(item_key)
-    if not attach_id:
-        return {}
-
-    conn = sqlite3.connect(f"file:{ZOTERO_DB_PATH}?mode=ro", uri=True)
-    cur = conn.cursor()
-    cur.execute("SELECT parentItemID FROM itemAttachments WHERE itemID = ?", (attach_id,))
-    row = cur.fetchone()
-    parent_id = row[0] if row else None
-    if not parent_id:
-        conn.close()
-        return {}
-
-    def fetch_field(field_name: str):
-        cur.execute("""
-            SELECT v.value
-            FROM itemData d
-            JOIN itemDataValues v ON d.valueID = v.valueID
-            JOIN fieldsCombined f ON d.fieldID = f.fieldID
-            WHERE d.itemID = ?
-              AND f.fieldName = ?
-        """, (parent_id, field_name))
-        row = cur.fetchone()
-        return row[0] if row else None
-
-    def fetch_authors():
-        cur.execute("""
-            SELECT c.firstName, c.lastName
-            FROM itemCreators ic
-            JOIN creators c ON ic.creatorID = c.creatorID
-            WHERE ic.itemID = ?
-            ORDER BY ic.orderIndex
-        """, (parent_id,))
-        return [f"{fn} {ln}".strip() for fn, ln in cur.fetchall()]
-
-    metadata = {
-        "title": fetch_field("title"),
-        "url": fetch_field("url"),
-        "authors": ", ".join(fetch_authors()),
-        "year": fetch_field("date"),
-        "venue": fetch_field("publicationTitle"),
-        "doi": fetch_field("DOI"),
-    }
-
-    annotations = get_annotations_by_key(item_key)
+def add_highlight_columns(metadata: dict, annotations: list[dict]) -> dict:
     color_map = {"yellow": [], "green": [], "blue": [], "purple": [], "red": []}
     for ann in annotations:
         color_map[ann["color"]].append(ann["text"])
@@ -158,6 +1095,16 @@ def get_full_metadata(item_key: str) -> dict:
         "claims": format_bullets(color_map["purple"]),
         "limitations": format_bullets(color_map["red"]),
     })
-
-    conn.close()
     return metadata
+
+def get_full_metadata(item_key: str, context: bool = False, merge: bool = False) -> dict:
+    return get_reader().full_metadata(item_key, context, merge)
+
+def get_group_item_ids(name: str) -> tuple[str, list[int]]:
+    return get_reader().group_item_ids(name)
+
+def get_bulk_full_metadata(parent_ids: list[int], merge: bool = False) -> dict[int, dict]:
+    return get_reader().bulk_full_metadata(parent_ids, merge)
+
+def get_item_fields(parent_ids: list[int], field_names: list[str]) -> dict[int, dict[str, str | None]]:
+    return get_reader().load_fields(parent_ids, field_names)